@@ -68,6 +68,9 @@ class ManhwaFileHandler(FileHandler):
 
 
 class ManhwaPipeline(ComicTranslatePipeline):
+    # Pages detected per TextBlockDetector.detect_batch call
+    detect_batch_size = 4
+
     def skip_save(self, directory, timestamp, base_name, extension, archive_bname, image):
         path = os.path.join(directory, "translated", archive_bname)
         if not os.path.exists(path):
@@ -76,12 +79,16 @@ class ManhwaPipeline(ComicTranslatePipeline):
         cv2.imwrite(os.path.join(path, f"{base_name}{extension}"), image_save)
 
     def log_skipped_image(self, directory, timestamp, image_path):
+        os.makedirs(os.path.join(directory, "translated"), exist_ok=True)
         with open(os.path.join(directory, f"translated", "skipped_images.txt"), 'a', encoding='UTF-8') as file:
             file.write(image_path + "\n")
             
     def batch_process(self):
         timestamp = datetime.now().strftime("%b-%d-%Y_%I-%M-%S%p")
         total_images = len(self.main_page.image_files)
+        # Detections of the pages in the current detection batch, and the pages decoded for it
+        detected_blocks = {}
+        decoded_images = {}
 
         for index, image_path in enumerate(self.main_page.image_files):
 
@@ -109,7 +116,16 @@ class ManhwaPipeline(ComicTranslatePipeline):
                         directory = os.path.dirname(archive_path)
                         archive_bname = os.path.splitext(os.path.basename(archive_path))[0]
 
-            image = cv2.imread(image_path)
+            if image_path in decoded_images:
+                image = decoded_images.pop(image_path)
+            else:
+                image = cv2.imread(image_path)
+            if image is None:
+                error_message = f"Could not read {image_path}"
+                print(error_message)
+                self.main_page.image_skipped.emit(image_path, "Image", error_message)
+                self.log_skipped_image(directory, timestamp, image_path)
+                continue
 
             # Text Block Detection
             self.main_page.progress_update.emit(index, total_images, 1, 10, False)
@@ -117,13 +133,16 @@ class ManhwaPipeline(ComicTranslatePipeline):
                 self.main_page.current_worker = None
                 break
 
-            if self.block_detector_cache is None:
-                bdetect_device = 0 if self.main_page.settings_page.is_gpu_enabled() else 'cpu'
-                self.block_detector_cache = TextBlockDetector('models/detection/comic-speech-bubble-detector.pt', 
-                                                            'models/detection/comic-text-segmenter.pt', 'models/detection/manga-text-detector.pt', 
-                                                            bdetect_device)
-            
-            blk_list = self.block_detector_cache.detect(image)
+            if image_path not in detected_blocks:
+                # Detect the next few pages in one batch, keeping them decoded for their own turn
+                upcoming = self.main_page.image_files[index + 1:index + self.detect_batch_size]
+                decoded_images = {path: cv2.imread(path) for path in upcoming}
+                # Pages that cannot be read are skipped on their turn instead of failing the batch
+                readable = [image_path] + [path for path in upcoming if decoded_images[path] is not None]
+                images = [image] + [decoded_images[path] for path in readable[1:]]
+                with model_registry.use('text_block_detector', self.model_device()) as detector:
+                    detected_blocks = dict(zip(readable, detector.detect_batch(images)))
+            blk_list = detected_blocks.pop(image_path)
 
             self.main_page.progress_update.emit(index, total_images, 2, 10, False)
             if self.main_page.current_worker and self.main_page.current_worker.is_cancelled:
@@ -155,13 +174,6 @@ class ManhwaPipeline(ComicTranslatePipeline):
             # Clean Image of text
             export_settings = settings_page.get_export_settings()
 
-            if self.inpainter_cache is None or self.cached_inpainter_key != settings_page.get_tool_selection('inpainter'):
-                device = 'cuda' if settings_page.is_gpu_enabled() else 'cpu'
-                inpainter_key = settings_page.get_tool_selection('inpainter')
-                InpainterClass = inpaint_map[inpainter_key]
-                self.inpainter_cache = InpainterClass(device)
-                self.cached_inpainter_key = inpainter_key
-
             config = get_config(settings_page)
             mask = generate_mask(image, blk_list)
 
@@ -170,7 +182,7 @@ class ManhwaPipeline(ComicTranslatePipeline):
                 self.main_page.current_worker = None
                 break
 
-            inpaint_input_img = self.inpainter_cache(image, mask, config)
+            inpaint_input_img = self.run_inpainter(image, mask, config)
             inpaint_input_img = cv2.convertScaleAbs(inpaint_input_img) 
             inpaint_input_img = cv2.cvtColor(inpaint_input_img, cv2.COLOR_BGR2RGB)
 
@@ -307,7 +319,7 @@ class ManhwaPipeline(ComicTranslatePipeline):
 
 
 class ComicTranslateDjango(ComicTranslate):
-    def __init__(self, parent=None, ready_event=None):
+    def __init__(self, parent=None, ready_event=None, settings_path=None):
         super(ComicTranslateDjango, self).__init__(parent)
         self.file_handler = ManhwaFileHandler()
         self.pipeline = ManhwaPipeline(self)
@@ -318,6 +330,7 @@ class ComicTranslateDjango(ComicTranslate):
         self.websocket.disconnected.connect(self.on_disconnected)
         self.websocket.textMessageReceived.connect(self.receive_message)
         self.ready_event = ready_event
+        self.settings_path = settings_path
 
         self.connect_to_server()
 
@@ -390,8 +403,15 @@ class ComicTranslateDjango(ComicTranslate):
             self.translation_queue.pop(manhwa.name, None)
         self.next_manhwa()
 
+    def closeEvent(self, event):
+        # Keep the headless workers in sync with the settings chosen here
+        if self.settings_path:
+            from comic_headless import save_settings
+            save_settings(self, self.settings_path)
+        super().closeEvent(event)
+
 
-def run_comic_translate(ready_event):
+def run_comic_translate(ready_event, settings_path=None):
     import sys
     from PySide6.QtGui import QIcon
     from app.ui.dayu_widgets.qt import application
@@ -415,7 +435,7 @@ def run_comic_translate(ready_event):
         if selected_language != 'English':
             load_translation(app, selected_language)
 
-        test = ComicTranslateDjango(ready_event=ready_event)
+        test = ComicTranslateDjango(ready_event=ready_event, settings_path=settings_path)
         test.show()
 
 
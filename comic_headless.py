@@ -0,0 +1,209 @@
+import json
+import os
+
+
+default_settings = {
+    'source_language': 'Korean',
+    'target_language': 'English',
+    'tools': {
+        'translator': 'GPT-4o',
+        'ocr': 'Default',
+        'inpainter': 'LaMa',
+        'use_gpu': False,
+        'hd_strategy': {'strategy': 'Resize', 'resize_limit': 960}
+    },
+    'text_rendering': {
+        'alignment': 'Center',
+        'font': '',
+        'min_font_size': 12,
+        'max_font_size': 40,
+        'color': '#000000',
+        'upper_case': False,
+        'outline': True,
+    },
+    'llm': {
+        'extra_context': '',
+        'image_input_enabled': True
+    },
+    'export': {
+        'export_raw_text': False,
+        'export_translated_text': False,
+        'export_inpainted_image': False,
+        'save_as': {}
+    },
+    'credentials': {},
+}
+
+
+def load_settings(path) -> dict:
+    """Load a settings dict dumped by save_settings, filling in the GUI defaults."""
+    settings = json.loads(json.dumps(default_settings))
+    if path and os.path.isfile(path):
+        with open(path, 'r', encoding='UTF-8') as file:
+            saved = json.load(file)
+        for key, value in saved.items():
+            if isinstance(value, dict) and isinstance(settings.get(key), dict):
+                settings[key].update(value)
+            else:
+                settings[key] = value
+    return settings
+
+
+def save_settings(main_page, path):
+    """Dump the settings of a ComicTranslate window so headless workers can use them."""
+    value_mappings = main_page.settings_page.ui.value_mappings
+
+    def to_english(value):
+        if isinstance(value, dict):
+            return {value_mappings.get(k, k): to_english(v) for k, v in value.items()}
+        if isinstance(value, str):
+            return value_mappings.get(value, value)
+        return value
+
+    settings = to_english(main_page.settings_page.get_all_settings())
+    settings['source_language'] = main_page.lang_mapping[main_page.s_combo.currentText()]
+    settings['target_language'] = main_page.lang_mapping[main_page.t_combo.currentText()]
+    if not settings.get('save_keys'):
+        settings.pop('credentials', None)
+
+    with open(path, 'w', encoding='UTF-8') as file:
+        json.dump(settings, file, indent=4)
+
+
+class HeadlessSignal:
+    """Stands in for a Qt Signal; the pipeline emits progress nobody listens to."""
+    def emit(self, *args):
+        pass
+
+
+class HeadlessSettingsUI:
+    """Settings are stored in English, so translating is the identity."""
+    value_mappings = {}
+
+    def tr(self, text: str) -> str:
+        return text
+
+
+class HeadlessSettingsPage:
+    """Serves SettingsPage values from a serialized settings dict instead of widgets."""
+    def __init__(self, settings: dict):
+        self.settings = settings
+        self.ui = HeadlessSettingsUI()
+
+    def get_tool_selection(self, tool_type):
+        return self.settings['tools'][tool_type]
+
+    def is_gpu_enabled(self):
+        return bool(self.settings['tools']['use_gpu'])
+
+    def get_text_rendering_settings(self):
+        return self.settings['text_rendering']
+
+    def get_llm_settings(self):
+        return self.settings['llm']
+
+    def get_export_settings(self):
+        return self.settings['export']
+
+    def get_credentials(self, service: str = ""):
+        credentials = self.settings.get('credentials', {})
+        if service:
+            if service == "Microsoft Azure":
+                default = {'api_key_ocr': '', 'api_key_translator': '', 'region_translator': '', 'endpoint': ''}
+            else:
+                default = {'api_key': ''}
+            return {**default, **credentials.get(service, {})}
+        return credentials
+
+    def get_hd_strategy_settings(self):
+        return self.settings['tools']['hd_strategy']
+
+    def get_all_settings(self):
+        return self.settings
+
+    def get_min_font_size(self):
+        return int(self.settings['text_rendering']['min_font_size'])
+
+    def get_max_font_size(self):
+        return int(self.settings['text_rendering']['max_font_size'])
+
+
+class HeadlessComicTranslate:
+    """The subset of ComicTranslate that ManhwaPipeline.batch_process relies on, without any widgets."""
+    def __init__(self, settings: dict):
+        from comic_django import ManhwaFileHandler
+
+        self.settings_page = HeadlessSettingsPage(settings)
+        self.file_handler = ManhwaFileHandler()
+        self.source_lang = settings['source_language']
+        self.target_lang = settings['target_language']
+        self.lang_mapping = {self.source_lang: self.source_lang, self.target_lang: self.target_lang}
+
+        self.image_files = []
+        self.image_states = {}
+        self.current_worker = None
+        self.progress_update = HeadlessSignal()
+        self.image_processed = HeadlessSignal()
+        self.image_skipped = HeadlessSignal()
+
+    def tr(self, text: str) -> str:
+        return text
+
+    def load_images(self, page_paths):
+        page_paths = sorted(page_paths, key=lambda x: int(os.path.splitext(os.path.basename(x))[0]))
+        self.file_handler.file_paths = page_paths
+        self.image_files = self.file_handler.prepare_files()
+        self.image_states = {
+            image_path: {'source_lang': self.source_lang, 'target_lang': self.target_lang}
+            for image_path in self.image_files
+        }
+
+
+default_ocr_models = {'Japanese': 'manga_ocr', 'English': 'easyocr', 'Korean': 'pororo'}
+
+
+def pipeline_models(settings: dict) -> list[str]:
+    """The registry names of the local models a batch translation with settings uses."""
+    models = ['text_block_detector', settings['tools']['inpainter']]
+    if settings['tools']['ocr'] == 'Default' and settings['source_language'] in default_ocr_models:
+        models.append(default_ocr_models[settings['source_language']])
+    return models
+
+
+def run_headless_worker(settings_path, job_queue, result_queue, warm_models=None, model_budget_mb=None):
+    """
+    Translate chapters pulled from job_queue until a None sentinel arrives.
+
+    Each job is a (toonkor_id, chapter_index, page_paths) tuple and produces a
+    (toonkor_id, chapter_index, error) tuple on result_queue, error being None on success.
+
+    warm_models are loaded before the first job, None meaning every model the
+    settings call for. model_budget_mb caps the memory of the loaded models.
+    """
+    from comic_django import ManhwaPipeline
+    from modules.utils.model_registry import model_registry
+
+    settings = load_settings(settings_path)
+    main_page = HeadlessComicTranslate(settings)
+    pipeline = ManhwaPipeline(main_page)
+
+    if model_budget_mb is not None:
+        model_registry.budget_mb = model_budget_mb
+    model_registry.warm(pipeline_models(settings) if warm_models is None else warm_models, pipeline.model_device())
+
+    while True:
+        try:
+            job = job_queue.get()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+
+        toonkor_id, chapter_index, page_paths = job
+        try:
+            main_page.load_images(page_paths)
+            pipeline.batch_process()
+            result_queue.put((toonkor_id, chapter_index, None))
+        except Exception as e:
+            result_queue.put((toonkor_id, chapter_index, str(e)))
+
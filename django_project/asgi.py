@@ -3,13 +3,19 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from django.urls import path
-from toonkor_collector2.consumers import DownloadTranslateConsumer, QtConsumer
+from toonkor_collector2.consumers import DownloadTranslateConsumer, LibraryConsumer, QtConsumer
+from toonkor_collector2.cleaner import cleaner
+from toonkor_collector2.compactor import compactor
+from toonkor_collector2.downloader import downloader
+from toonkor_collector2.jobs import reconcile_jobs
+from toonkor_collector2.translator import translator
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_project.settings")
 
 websocket_urlpatterns = [
     path('ws/download_translate/<str:toonkor_id>/', DownloadTranslateConsumer.as_asgi()),
     path('ws/qt/', QtConsumer.as_asgi()),
+    path('ws/library/', LibraryConsumer.as_asgi()),
 ]
 
 application = ProtocolTypeRouter({
@@ -19,4 +25,11 @@ application = ProtocolTypeRouter({
             websocket_urlpatterns
         )
     ),
-})
\ No newline at end of file
+})
+
+# Resume the jobs left over by the previous run
+reconcile_jobs()
+downloader.start()
+translator.start()
+cleaner.start()
+compactor.start()
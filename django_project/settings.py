@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -80,11 +82,62 @@ TEMPLATES = [
 
 ASGI_APPLICATION = 'django_project.asgi.application'
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
+# A redis:// or rediss:// url shares WebSocket events between processes (needs channels-redis==3.4.1),
+# otherwise they stay in this process
+CHANNEL_LAYER_URL = os.environ.get("CHANNEL_LAYER_URL", "")
+
+if CHANNEL_LAYER_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [CHANNEL_LAYER_URL],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "toonkor_collector2.channel_layers.LocalChannelLayer",
+        },
+    }
+
+# Chapters downloaded at once, and the page connections they share
+DOWNLOAD_CHAPTERS_IN_FLIGHT = 3
+DOWNLOAD_WORKERS = 16
+DOWNLOAD_CONNECTIONS_PER_HOST = 8
+
+# On-disk cache of Toonkor html, with the seconds before each endpoint type is revalidated
+HTTP_CACHE_DIR = BASE_DIR.joinpath('toonkor_collector2', 'http_cache')
+HTTP_CACHE_TTL = {
+    "details": 10 * 60,
+    "search": 5 * 60,
+    "pages": 24 * 60 * 60,
+    # Library refreshes always revalidate
+    "refresh": 0,
 }
+# Entries unused for HTTP_CACHE_MAX_AGE seconds are dropped, then the oldest until the cache fits HTTP_CACHE_MAX_BYTES
+HTTP_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# In-memory caches of manhwa details and MangaDex lookups: max entries and seconds to live
+MANHWA_CACHE_SIZE = 256
+MANHWA_CACHE_TTL = 30 * 60
+MANGADEX_CACHE_SIZE = 1024
+MANGADEX_CACHE_TTL = 24 * 60 * 60
+
+# Most Manhwa a single /library page may ask for
+LIBRARY_PAGE_MAX = 500
+
+# Number of headless Comic Translate worker processes; 0 keeps the GUI bridge
+COMIC_TRANSLATE_WORKERS = 0
+# Settings dumped by the Comic Translate GUI on close, read by the headless workers
+COMIC_TRANSLATE_SETTINGS = BASE_DIR / "comic_translate_settings.json"
+# Models each worker loads before its first chapter (names from modules.utils.model_registry),
+# None for every model the settings call for
+COMIC_TRANSLATE_WARM_MODELS = None
+# Megabytes of models a worker keeps loaded before dropping the least recently used, None for no limit
+COMIC_TRANSLATE_MODEL_BUDGET_MB = None
 
 
 # Database
@@ -94,9 +147,21 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # WAL lets the worker threads read while one of them writes
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
     }
 }
 
+# Seconds between flushes of buffered chapter status updates
+STATUS_FLUSH_INTERVAL = 0.3
+
+# Most progress messages sent to a WebSocket group per second
+PROGRESS_FLUSH_RATE = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -144,4 +209,25 @@ STATICFILES_DIRS = [STATIC_DIR, ]
 MEDIA_ROOT = MEDIA_DIR
 MEDIA_URL = "/media/"
 
+# Resized WebP/AVIF copies of media images served under /derived/<width>/
+DERIVATIVE_DIR = BASE_DIR.joinpath('toonkor_collector2', 'derivatives')
+DERIVATIVE_WIDTHS = (160, 320, 480, 720, 1080)
+DERIVATIVE_QUALITY = 80
+
+# Hard link identical downloaded pages to one copy in BLOB_STORE_DIR
+MEDIA_DEDUPLICATE = False
+BLOB_STORE_DIR = MEDIA_DIR.joinpath('blobs')
+
+# Pack chapters untouched for this many days into CBZ archives, None to keep them as loose files
+CHAPTER_ARCHIVE_AGE = None
+CHAPTER_ARCHIVE_INTERVAL = 60 * 60
+ARCHIVE_INDEX_CACHE_SIZE = 256
+ARCHIVE_INDEX_CACHE_TTL = 60 * 60
+
+# "X-Sendfile" or "X-Accel-Redirect" to let a front proxy send media files, "" to send them from Django
+MEDIA_SENDFILE_HEADER = ""
+# Internal nginx location mapped to BASE_DIR, used with X-Accel-Redirect
+MEDIA_ACCEL_PREFIX = "/protected/"
+
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor"]
@@ -18,9 +18,8 @@ import sys
 
 from django.contrib import admin
 from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path, re_path
-from toonkor_collector2.views import serve_react
+from toonkor_collector2.views import serve_derivative, serve_media, serve_react
 
 if "makemigrations" in sys.argv or "migrate" in sys.argv:
     urlpatterns = []
@@ -30,7 +29,9 @@ else:
     urlpatterns = [
         path("admin/", admin.site.urls),
         path("api/", api.urls),
-    ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+        re_path(r"^derived/(?P<width>\d+)/(?P<path>.+)$", serve_derivative),
+        re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.+)$", serve_media),
+    ]
 
     # Catch-all React route should be last
     urlpatterns += [re_path(r"^(?P<path>.*)$", serve_react, {"document_root": settings.REACT_APP_BUILD_PATH})]
@@ -1,70 +1,260 @@
 from ultralytics import YOLO
 import largestinteriorrectangle as lir
 from .utils.textblock import TextBlock, adjust_text_line_coordinates
+from .utils import box_ops
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import numpy as np 
 import cv2
 
 
+torch_threads_divided = False
+
+def divide_torch_threads(parts: int):
+    """Give each of parts concurrent models its share of the cores, once per process since the setting is process-wide."""
+    global torch_threads_divided
+    import torch
+
+    if not torch_threads_divided:
+        torch.set_num_threads(max(1, torch.get_num_threads() // parts))
+        torch_threads_divided = True
+
+
 class TextBlockDetector:
-    def __init__(self, bubble_model_path: str, text_seg_model_path: str, text_detect_model_path: str, device: str):
+    def __init__(self, bubble_model_path: str, text_seg_model_path: str, text_detect_model_path: str, device: str,
+                 parallel: bool | None = None):
+        """
+        parallel runs the three models of a detection concurrently instead of back to back,
+        so a page takes about as long as the slowest model. It defaults to on for the CPU,
+        where each model gets its share of the torch intra-op threads. The thread count is
+        process-wide, so it is divided once at load rather than on every detection.
+        """
         self.bubble_detection = YOLO(bubble_model_path)
         self.text_segmentation = YOLO(text_seg_model_path)
         self.text_detection = YOLO(text_detect_model_path)
         self.device = device
+        self.parallel = device == 'cpu' if parallel is None else parallel
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # The ultralytics predictors are not thread-safe, detections on one detector run one at a time
+        self._models_lock = threading.Lock()
+        if self.parallel:
+            divide_torch_threads(len(self.models()))
+
+    def models(self):
+        """The bubble detector, text segmenter and text detector with their input size and confidence."""
+        return (
+            (self.bubble_detection, 1024, 0.1),
+            (self.text_segmentation, 1024, 0.1),
+            (self.text_detection, 640, 0.2),
+        )
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=len(self.models()), thread_name_prefix='detection')
+            return self._executor
+
+    def run_models(self, run) -> list:
+        """Call run(model, imgsz, conf) for each model, concurrently in parallel mode, and return the results in order."""
+        with self._models_lock:
+            if not self.parallel:
+                return [run(*model) for model in self.models()]
+            futures = [self.executor().submit(run, *model) for model in self.models()]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def is_tall(img) -> bool:
+        h, w = img.shape[:2]
+        return h >= w * 5
 
     def detect(self, img):
-        self.image = img
+        if self.is_tall(img):
+            return self.detect_tiled(img)
+
+        bble_detec_result, txt_seg_result, txt_detect_result = self.run_models(
+            lambda model, imgsz, conf: model(img, device=self.device, imgsz=imgsz, conf=conf, verbose=False)[0]
+        )
+
+        return self.text_blocks(img, bble_detec_result, txt_seg_result, txt_detect_result)
+
+    def detect_tiled(self, img, overlap: float = 0.25, batch_size: int = 8):
+        """
+        Detect the text blocks of a tall strip with a sliding window.
+
+        The strip is cut into square tiles overlapping by `overlap` of their height,
+        which the models see at their usual input size, and the boxes found in each
+        tile are stitched back into page coordinates (see merge_tiled_boxes).
+        """
+        tiles = tile_offsets(img.shape[0], img.shape[1], overlap)
+        crops = [img[y1:y2] for y1, y2 in tiles]
+
+        def run(model, imgsz, conf):
+            results = []
+            for start in range(0, len(crops), batch_size):
+                results += model(crops[start:start + batch_size], device=self.device, imgsz=imgsz, conf=conf, verbose=False)
+            return merge_tiled_boxes(
+                [np.array(result.boxes.xyxy.cpu(), dtype="int") for result in results],
+                [np.array(result.boxes.conf.cpu()) for result in results],
+                tiles,
+            )
+
+        boxes = self.run_models(run)
+
+        combined = self.combine_boxes(img, *boxes)
+        return [TextBlock(txt_bbox, bble_bbox, txt_class, inp_bboxes)
+                for txt_bbox, bble_bbox, inp_bboxes, txt_class in combined]
+
+    def detect_batch(self, images: list, batch_size: int = 8) -> list[list[TextBlock]]:
+        """
+        Detect the text blocks of several images, running each model once per batch.
+
+        Images are letterboxed to the models' input size and inferred together.
+        Very tall strips keep their own size like in detect(), so they go one by one.
+        Returns the block list of each image, in order.
+        """
+        blk_lists = [None] * len(images)
+        regular = []
+        for index, img in enumerate(images):
+            if self.is_tall(img):
+                blk_lists[index] = self.detect(img)
+            else:
+                regular.append(index)
+
+        for start in range(0, len(regular), batch_size):
+            indexes = regular[start:start + batch_size]
+            batch = [images[index] for index in indexes]
+
+            bble_detec_results, txt_seg_results, txt_detect_results = self.run_models(
+                lambda model, imgsz, conf: model(batch, device=self.device, imgsz=imgsz, conf=conf, verbose=False)
+            )
 
-        h, w, _ = img.shape
-        size = (h, w) if h >= w * 5 else 1024
-        det_size = (h, w) if h >= w * 5 else 640
+            for index, bble_detec_result, txt_seg_result, txt_detect_result in zip(
+                indexes, bble_detec_results, txt_seg_results, txt_detect_results
+            ):
+                blk_lists[index] = self.text_blocks(images[index], bble_detec_result, txt_seg_result, txt_detect_result)
 
-        bble_detec_result = self.bubble_detection(img, device=self.device, imgsz=size, conf=0.1, verbose=False)[0]
-        txt_seg_result = self.text_segmentation(img, device=self.device, imgsz=size, conf=0.1, verbose=False)[0]
-        txt_detect_result = self.text_detection(img, device=self.device, imgsz=det_size, conf=0.2, verbose=False)[0]
+        return blk_lists
 
-        combined = self.combine_results(bble_detec_result, txt_seg_result, txt_detect_result)
+    def text_blocks(self, img, bble_detec_result, txt_seg_result, txt_detect_result) -> list[TextBlock]:
+        combined = self.combine_results(img, bble_detec_result, txt_seg_result, txt_detect_result)
 
         blk_list = [TextBlock(txt_bbox, bble_bbox, txt_class, inp_bboxes)
                 for txt_bbox, bble_bbox, inp_bboxes, txt_class in combined]
         
         return blk_list
     
-    def combine_results(self, bubble_detec_results: YOLO, text_seg_results: YOLO, text_detect_results: YOLO):
+    def combine_results(self, img, bubble_detec_results: YOLO, text_seg_results: YOLO, text_detect_results: YOLO):
         bubble_bounding_boxes = np.array(bubble_detec_results.boxes.xyxy.cpu(), dtype="int")
         
         seg_text_bounding_boxes = np.array(text_seg_results.boxes.xyxy.cpu(), dtype="int")
         detect_text_bounding_boxes = np.array(text_detect_results.boxes.xyxy.cpu(), dtype="int")
 
-        text_bounding_boxes = merge_bounding_boxes(seg_text_bounding_boxes, detect_text_bounding_boxes)
+        return self.combine_boxes(img, bubble_bounding_boxes, seg_text_bounding_boxes, detect_text_bounding_boxes)
+
+    def combine_boxes(self, img, bubble_bounding_boxes, seg_text_bounding_boxes, detect_text_bounding_boxes):
+        text_bounding_boxes = box_ops.merge_bounding_boxes(seg_text_bounding_boxes, detect_text_bounding_boxes)
 
         text_blocks_bboxes = []
         # Process each text bounding box
         for bbox in text_bounding_boxes:
-            adjusted_bboxes = get_inpaint_bboxes(bbox, self.image)
+            adjusted_bboxes = get_inpaint_bboxes(bbox, img)
             text_blocks_bboxes.append(adjusted_bboxes)
 
         raw_results = []
-        text_matched = [False] * len(text_bounding_boxes)
+        matches = box_ops.match_bubbles(text_bounding_boxes, bubble_bounding_boxes)
+        for txt_idx, (txt_box, (bble_idx, text_class)) in enumerate(zip(text_bounding_boxes, matches)):
+            bble_box = bubble_bounding_boxes[bble_idx] if bble_idx is not None else None
+            raw_results.append((txt_box, bble_box, text_blocks_bboxes[txt_idx], text_class))
 
-        if text_bounding_boxes is not None or len(text_bounding_boxes) > 0:
-            for txt_idx, txt_box in enumerate(text_bounding_boxes):
-                for bble_box in bubble_bounding_boxes:
+        return raw_results
+    
+def tile_offsets(height: int, width: int, overlap: float = 0.25) -> list[tuple[int, int]]:
+    """Vertical (y1, y2) spans of square tiles covering a strip, consecutive ones overlapping."""
+    tile = min(width, height)
+    step = max(1, int(tile * (1 - overlap)))
+    starts = list(range(0, max(height - tile, 0) + 1, step))
+    if starts[-1] + tile < height:
+        starts.append(height - tile)
+    return [(y1, y1 + tile) for y1 in starts]
+
+def nms(boxes, scores, iou_threshold: float = 0.5):
+    """Indexes of the boxes kept by non-maximum suppression, best score first."""
+    boxes = np.asarray(boxes, dtype=float)
+    order = np.argsort(scores)[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        intersection = w * h
+        union = areas[i] + areas[rest] - intersection
+        iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+        # Boxes cut by a tile edge lie mostly inside the whole box found in the next tile
+        smaller = np.minimum(areas[i], areas[rest])
+        containment = np.divide(intersection, smaller, out=np.zeros_like(intersection), where=smaller > 0)
+        order = rest[(iou < iou_threshold) & (containment < 0.9)]
+    return keep
+
+def merge_tiled_boxes(tile_boxes, tile_scores, tiles, edge: int = 2):
+    """
+    Stitch the boxes found in overlapping tiles into page coordinates.
 
-                    if does_rectangle_fit(bble_box, txt_box):
-                        raw_results.append((txt_box, bble_box, text_blocks_bboxes[txt_idx], 'text_bubble'))
-                        text_matched[txt_idx] = True
-                        break
-                    elif do_rectangles_overlap(bble_box, txt_box):
-                        raw_results.append((txt_box, bble_box, text_blocks_bboxes[txt_idx], 'text_free'))
-                        text_matched[txt_idx] = True
-                        break
+    An object taller than the overlap is cut in two by the tile edges, so a box
+    touching the bottom of its tile is joined with a box touching the top of the
+    next tile if they line up horizontally. A cut box that lies inside an uncut
+    box of an overlapping tile is only a fragment of it and is dropped whatever
+    its score. Duplicates from the overlaps are then dropped with NMS.
+    """
+    boxes, scores, cut_top, cut_bottom, tile_index = [], [], [], [], []
+    for index, ((y1, y2), tile_box, tile_score) in enumerate(zip(tiles, tile_boxes, tile_scores)):
+        for box, score in zip(tile_box, tile_score):
+            bx1, by1, bx2, by2 = box
+            boxes.append([bx1, by1 + y1, bx2, by2 + y1])
+            scores.append(score)
+            cut_top.append(index > 0 and by1 <= edge)
+            cut_bottom.append(index < len(tiles) - 1 and by2 >= (y2 - y1) - edge)
+            tile_index.append(index)
+
+    if not boxes:
+        return np.zeros((0, 4), dtype="int")
+    boxes = np.array(boxes, dtype="int")
+    scores = np.array(scores, dtype=float)
+
+    for i in range(len(boxes)):
+        if not cut_bottom[i]:
+            continue
+        for j in range(len(boxes)):
+            if tile_index[j] != tile_index[i] + 1 or not cut_top[j]:
+                continue
+            overlap = min(boxes[i][2], boxes[j][2]) - max(boxes[i][0], boxes[j][0])
+            span = max(boxes[i][2], boxes[j][2]) - min(boxes[i][0], boxes[j][0])
+            if span > 0 and overlap / span >= 0.5:
+                joined = merge_boxes(boxes[i], boxes[j])
+                boxes[i] = boxes[j] = joined
+                scores[i] = scores[j] = max(scores[i], scores[j])
+
+    cut = np.array(cut_top) | np.array(cut_bottom)
+    tile_index = np.array(tile_index)
+    tile_spans = np.array(tiles)[tile_index]
+    overlapping_tiles = (
+        (tile_index[:, None] != tile_index[None, :])
+        & (tile_spans[:, None, 0] < tile_spans[None, :, 1])
+        & (tile_spans[None, :, 0] < tile_spans[:, None, 1])
+    )
+    # fragments[i, j]: box j is cut by its tile edge and lies inside the uncut box i
+    fragments = (
+        ~cut[:, None] & cut[None, :] & overlapping_tiles
+        & box_ops.pairwise_mostly_contained(boxes, boxes, 0.9)
+    )
+    whole = ~fragments.any(axis=0)
+    boxes, scores = boxes[whole], scores[whole]
 
-                if not text_matched[txt_idx]:
-                    raw_results.append((txt_box, None, text_blocks_bboxes[txt_idx], 'text_free'))
+    return boxes[nms(boxes, scores)]
 
-        return raw_results
-    
 def get_inpaint_bboxes(text_bbox, image):
     x1, y1, x2, y2 = adjust_text_line_coordinates(text_bbox, 0, 10, image)
         
@@ -1 +1,6 @@
+from .lama import LaMa
 
+
+inpaint_map = {
+    "LaMa": LaMa
+}
@@ -32,9 +32,11 @@ LAMA_MODEL_MD5 = os.environ.get("LAMA_MODEL_MD5", "c09472d8ff584452a2c4529af520f
 class LaMa(InpaintModel):
     name = "lama"
     pad_mod = 8
+    # Weights file under models/inpainting
+    model_file = "lama_large_512px.ckpt"
 
     def init_model(self, device, **kwargs):
-        self.model = load_lama_model(model_path='models/inpainting/lama_large_512px.ckpt', device=device, large_arch=True)
+        self.model = load_lama_model(model_path=os.path.join('models/inpainting', self.model_file), device=device, large_arch=True)
         #self.model = load_jit_model(LAMA_MODEL_URL, device, LAMA_MODEL_MD5).eval()
 
     @staticmethod
@@ -1,15 +1,12 @@
 import numpy as np
 import base64, json
-import easyocr
 import cv2
 import requests
 from typing import List
 from ..utils.translator_utils import get_llm_client
 from ..utils.textblock import TextBlock, adjust_text_line_coordinates
 from ..utils.pipeline_utils import lists_to_blk_list
-from ..utils.download import get_models, manga_ocr_data, pororo_data
-from ..ocr.manga_ocr.manga_ocr import MangaOcr
-from ..ocr.pororo.main import PororoOcr
+from ..utils.model_registry import model_registry
 from ..utils.pipeline_utils import language_codes
 
 
@@ -19,13 +16,8 @@ from azure.core.credentials import AzureKeyCredential
 
 
 
-manga_ocr_path = 'models/ocr/manga-ocr-base'
         
 class OCRProcessor:
-    manga_ocr_cache = None
-    easyocr_cache = None
-    pororo_cache = None
-
     def __init__(self):
         pass
 
@@ -172,8 +164,6 @@ class OCRProcessor:
         return blk_list
 
     def _ocr_default(self, img: np.ndarray, blk_list: List[TextBlock], source_language: str, device: str, expansion_percentage: int = 5):
-        gpu_state = False if device == 'cpu' else True
-
         for blk in blk_list:
             if blk.bubble_xyxy is not None:
                 x1, y1, x2, y2 = blk.bubble_xyxy
@@ -183,16 +173,12 @@ class OCRProcessor:
             # Check if the coordinates are valid and the bounding box does not extend outside the image
             if x1 < x2 and y1 < y2:
                 if source_language == self.main_page.tr('Japanese'):
-                    if self.manga_ocr_cache is None:
-                        get_models(manga_ocr_data)
-                        self.manga_ocr_cache = MangaOcr(pretrained_model_name_or_path=manga_ocr_path, device=device)
-                    blk.text = self.manga_ocr_cache(img[y1:y2, x1:x2])
+                    with model_registry.use('manga_ocr', device) as manga_ocr:
+                        blk.text = manga_ocr(img[y1:y2, x1:x2])
 
                 elif source_language == self.main_page.tr('English'):
-                    if self.easyocr_cache is None:
-                        self.easyocr_cache = easyocr.Reader(['en'], gpu = gpu_state)
-
-                    result = self.easyocr_cache.readtext(img[y1:y2, x1:x2], paragraph=True)
+                    with model_registry.use('easyocr', device) as reader:
+                        result = reader.readtext(img[y1:y2, x1:x2], paragraph=True)
                     texts = []
                     for r in result:
                         if r is None:
@@ -202,12 +188,9 @@ class OCRProcessor:
                     blk.text = text
                 
                 elif source_language == self.main_page.tr('Korean'):
-                    if self.pororo_cache is None:
-                        get_models(pororo_data)
-                        self.pororo_cache = PororoOcr()
-                    
-                    self.pororo_cache.run_ocr(img[y1:y2, x1:x2])
-                    result = self.pororo_cache.get_ocr_result()
+                    with model_registry.use('pororo', device) as pororo:
+                        pororo.run_ocr(img[y1:y2, x1:x2])
+                        result = pororo.get_ocr_result()
                     descriptions = result['description']
                     all_descriptions = ' '.join(descriptions)
                     blk.text = all_descriptions     
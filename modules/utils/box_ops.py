@@ -0,0 +1,172 @@
+"""
+Vectorized versions of the box helpers in modules.detection.
+
+Each pairwise function compares every box of `a` with every box of `b` and
+returns an (len(a), len(b)) matrix computed exactly like its scalar
+counterpart. The merge functions keep the order-dependent semantics of the
+loops they replace, but evaluate each step against all the remaining boxes
+at once instead of one pair per call.
+"""
+
+import numpy as np
+
+
+def as_boxes(boxes) -> np.ndarray:
+    boxes = np.asarray(boxes)
+    return boxes.reshape(-1, 4)
+
+
+def areas(boxes: np.ndarray) -> np.ndarray:
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def pairwise_intersection(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    w = np.maximum(0, np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]))
+    h = np.maximum(0, np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]))
+    return w * h
+
+
+def pairwise_iou(a, b) -> np.ndarray:
+    """calculate_iou of every pair."""
+    a, b = as_boxes(a), as_boxes(b)
+    intersection = pairwise_intersection(a, b)
+    union = areas(a)[:, None] + areas(b)[None, :] - intersection
+    iou = np.zeros(union.shape)
+    np.divide(intersection, union, out=iou, where=union != 0)
+    return iou
+
+
+def pairwise_fits(bigger, smaller) -> np.ndarray:
+    """does_rectangle_fit(bigger[i], smaller[j]) of every pair."""
+    bigger, smaller = as_boxes(bigger), as_boxes(smaller)
+    left1, right1 = np.minimum(bigger[:, 0], bigger[:, 2]), np.maximum(bigger[:, 0], bigger[:, 2])
+    top1, bottom1 = np.minimum(bigger[:, 1], bigger[:, 3]), np.maximum(bigger[:, 1], bigger[:, 3])
+    left2, right2 = np.minimum(smaller[:, 0], smaller[:, 2]), np.maximum(smaller[:, 0], smaller[:, 2])
+    top2, bottom2 = np.minimum(smaller[:, 1], smaller[:, 3]), np.maximum(smaller[:, 1], smaller[:, 3])
+    return (
+        (left1[:, None] <= left2[None, :]) & (right1[:, None] >= right2[None, :])
+        & (top1[:, None] <= top2[None, :]) & (bottom1[:, None] >= bottom2[None, :])
+    )
+
+
+def pairwise_mostly_contained(outer, inner, threshold: float) -> np.ndarray:
+    """is_mostly_contained(outer[i], inner[j], threshold) of every pair."""
+    outer, inner = as_boxes(outer), as_boxes(inner)
+    inner_area = areas(inner)[None, :]
+    intersection = pairwise_intersection(outer, inner)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        contained = intersection / inner_area >= threshold
+    return contained & ~(areas(outer)[:, None] < inner_area)
+
+
+def merge_boxes(box1, box2) -> list:
+    return [
+        min(box1[0], box2[0]),
+        min(box1[1], box2[1]),
+        max(box1[2], box2[2]),
+        max(box1[3], box2[3])
+    ]
+
+
+def grow_box(box, others: np.ndarray, start: int, condition, skip: int = -1):
+    """
+    Merge box with others[j] for j from start on, in order, whenever condition(box, others[j:]) holds.
+
+    Matches a loop that rechecks each box against the running box: the
+    condition is evaluated on all remaining boxes, the box grows on the first
+    hit and the scan resumes after it.
+    """
+    position = start
+    while position < len(others):
+        hits = np.flatnonzero(condition(box, others[position:]))
+        hits = hits[hits + position != skip]
+        if hits.size == 0:
+            break
+        j = position + hits[0]
+        box = merge_boxes(box, others[j])
+        position = j + 1
+    return box
+
+
+def merge_bounding_boxes(seg_boxes, detect_boxes):
+    """Vectorized modules.detection.merge_bounding_boxes with identical output."""
+    seg_boxes, detect_boxes = as_boxes(seg_boxes), as_boxes(detect_boxes)
+
+    def absorbs(box, others):
+        box = as_boxes(box)
+        return ~pairwise_fits(box, others)[0] & (pairwise_iou(box, others)[0] >= 0.02)
+
+    merged_boxes = [grow_box(seg_box, detect_boxes, 0, absorbs) for seg_box in seg_boxes]
+
+    # Detect boxes that no merged box covers, a detect box added here also covers the later ones
+    if len(detect_boxes):
+        if merged_boxes:
+            covered = (
+                (pairwise_iou(detect_boxes, merged_boxes) >= 0.1)
+                | pairwise_fits(merged_boxes, detect_boxes).T
+            ).any(axis=1)
+        else:
+            covered = np.zeros(len(detect_boxes), dtype=bool)
+        covers = (pairwise_iou(detect_boxes, detect_boxes) >= 0.1) | pairwise_fits(detect_boxes, detect_boxes).T
+        added = []
+        for i in range(len(detect_boxes)):
+            if not covered[i] and not covers[i, added].any():
+                added.append(i)
+        merged_boxes += [detect_boxes[i] for i in added]
+
+    merged_array = as_boxes(np.array(merged_boxes)) if merged_boxes else np.zeros((0, 4), dtype="int")
+
+    def joins(box, others):
+        box = as_boxes(box)
+        return (pairwise_iou(box, others)[0] >= 0.1) & ~pairwise_fits(box, others)[0]
+
+    final_boxes = [grow_box(box, merged_array, 0, joins, skip=i) for i, box in enumerate(merged_boxes)]
+
+    # Remove duplicates and high-overlap boxes
+    unique_boxes = []
+    if final_boxes:
+        final_array = as_boxes(np.array(final_boxes))
+        duplicates = (pairwise_iou(final_array, final_array) >= 0.6) | (
+            final_array[:, None, :] == final_array[None, :, :]
+        ).all(axis=2)
+        kept = []
+        for i in range(len(final_boxes)):
+            if not duplicates[i, kept].any():
+                kept.append(i)
+        unique_boxes = [final_boxes[i] for i in kept]
+
+    return np.array(unique_boxes)
+
+
+def match_bubbles(text_boxes, bubble_boxes) -> list[tuple[int | None, str]]:
+    """
+    The bubble of each text box as in TextBlockDetector.combine_boxes.
+
+    Returns (bubble index or None, text class) per text box: the first bubble
+    the text fits in or overlaps with IoU >= 0.2 wins.
+    """
+    text_boxes, bubble_boxes = as_boxes(text_boxes), as_boxes(bubble_boxes)
+    if len(bubble_boxes) == 0:
+        return [(None, 'text_free')] * len(text_boxes)
+
+    fits = pairwise_fits(bubble_boxes, text_boxes).T
+    overlaps = pairwise_iou(bubble_boxes, text_boxes).T >= 0.2
+    matches = fits | overlaps
+    first = matches.argmax(axis=1)
+
+    results = []
+    for i, j in enumerate(first):
+        if not matches[i, j]:
+            results.append((None, 'text_free'))
+        else:
+            results.append((int(j), 'text_bubble' if fits[i, j] else 'text_free'))
+    return results
+
+
+def assign_lines(outer_boxes, lines) -> list[list[int]]:
+    """Indexes of the lines that fit in, or are at least half inside, each outer box, in order."""
+    outer_boxes, lines = as_boxes(outer_boxes), as_boxes(lines)
+    if len(outer_boxes) == 0 or len(lines) == 0:
+        return [[] for _ in range(len(outer_boxes))]
+    inside = pairwise_fits(outer_boxes, lines) | pairwise_mostly_contained(outer_boxes, lines, 0.5)
+    return [np.flatnonzero(row).tolist() for row in inside]
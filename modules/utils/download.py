@@ -1,4 +1,4 @@
-import os, sys, hashlib
+import os, sys, hashlib, json, threading
 from torch.hub import download_url_to_file
 from loguru import logger
 
@@ -11,6 +11,10 @@ project_root = os.path.dirname(os.path.dirname(current_file_dir))
 # Define the base directory for all models
 models_base_dir = os.path.join(project_root, 'models')
 
+# Sidecar remembering the files whose checksum was verified, so they are not hashed again until they change
+verified_checksums_path = os.path.join(models_base_dir, 'verified_checksums.json')
+verified_checksums_lock = threading.Lock()
+
 def calculate_sha256_checksum(file_path):
     sha256_hash = hashlib.sha256()
     with open(file_path, "rb") as f:
@@ -19,7 +23,42 @@ def calculate_sha256_checksum(file_path):
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
-def get_models(data):
+def load_verified_checksums() -> dict:
+    try:
+        with open(verified_checksums_path, 'r', encoding='UTF-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_verified_checksums(updates: dict):
+    """Merge updates into the sidecar, None removing an entry. Workers may write it concurrently, so it is reread first."""
+    with verified_checksums_lock:
+        checksums = load_verified_checksums()
+        for key, entry in updates.items():
+            if entry is None:
+                checksums.pop(key, None)
+            else:
+                checksums[key] = entry
+        os.makedirs(models_base_dir, exist_ok=True)
+        temp_path = f"{verified_checksums_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='UTF-8') as f:
+            json.dump(checksums, f, indent=4)
+        os.replace(temp_path, verified_checksums_path)
+
+def verified_entry(file_path, checksum) -> dict:
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': checksum}
+
+def get_models(data, verify: bool = False):
+    """
+    Download the files of data that are missing or don't match their checksum.
+
+    A file whose checksum matched is recorded with its size and mtime and not
+    hashed again while those stay the same. verify rehashes every file anyway.
+    """
+    verified = load_verified_checksums()
+    updates = {}
+
     # Check if the save directory exists; if not, create it
     save_dir = data['save_dir']
     if not os.path.exists(save_dir):
@@ -31,16 +70,21 @@ def get_models(data):
 
         file_path = os.path.join(data['save_dir'], file_name)
         expected_checksum = data['sha256_pre_calculated'][i]
+        key = os.path.relpath(file_path, models_base_dir).replace(os.sep, '/')
 
         # Check if the file already exists
         if os.path.exists(file_path):
 
             # If there's an expected checksum, verify it
             if expected_checksum is not None:
+                if not verify and verified.get(key) == verified_entry(file_path, expected_checksum):
+                    continue
                 calculated_checksum = calculate_sha256_checksum(file_path)
                 if calculated_checksum == expected_checksum:
+                    updates[key] = verified_entry(file_path, calculated_checksum)
                     continue
                 else:
+                    updates[key] = None
                     print(f"Checksum mismatch for {file_name}. Expected {expected_checksum}, got {calculated_checksum}. Redownloading...")
 
         sys.stderr.write('Downloading: "{}" to {}\n'.format(file_url, save_dir))
@@ -50,7 +94,10 @@ def get_models(data):
             calculated_checksum = calculate_sha256_checksum(file_path)
             if calculated_checksum == expected_checksum:
                     logger.info(f"Download model success, sha256: {calculated_checksum}")
+                    updates[key] = verified_entry(file_path, calculated_checksum)
             else:
+                if updates:
+                    save_verified_checksums(updates)
                 try:
                     os.remove(file_path)
                     logger.error(
@@ -62,6 +109,9 @@ def get_models(data):
                     )
                 exit(-1)
 
+    if updates:
+        save_verified_checksums(updates)
+
 # Default Models
 manga_ocr_data = {
     'url': 'https://huggingface.co/kha-white/manga-ocr-base/resolve/main/',
@@ -129,4 +179,13 @@ manga_text_detector_data = {
 }
 
 mandatory_models = [comic_text_segmenter_data, inpaint_lama_finetuned_data,
-                    comic_bubble_detector_data, manga_text_detector_data]
\ No newline at end of file
+                    comic_bubble_detector_data, manga_text_detector_data]
+
+def verify_all_models():
+    """Rehash every model file, redownloading the ones that don't match their checksum."""
+    for data in mandatory_models + [manga_ocr_data, pororo_data]:
+        get_models(data, verify=True)
+
+if __name__ == "__main__":
+    # python -m modules.utils.download checks the integrity of all the models
+    verify_all_models()
@@ -0,0 +1,207 @@
+import gc
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .download import models_base_dir
+from ..inpainting import inpaint_map
+
+
+def path_size(path: str) -> int:
+    """Bytes taken on disk by a file or a directory of files."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(dirpath, file)) for file in filenames)
+    return size
+
+
+class ModelEntry:
+    def __init__(self, model, size: int):
+        self.model = model
+        self.size = size
+        self.refs = 0
+
+
+class ModelRegistry:
+    """
+    Process-wide store of the models used by the pipelines.
+
+    Models are loaded the first time they are asked for and shared by every
+    pipeline and OCR processor of the process, keyed by name and device.
+    Callers hold a reference while they run a model (see use()); once the
+    loaded models exceed budget_mb, the least recently used ones that nobody
+    holds are dropped. A model's size is estimated from its weight files.
+
+    Loading runs outside the lock, so a slow load only blocks the callers
+    waiting for that same model.
+    """
+
+    def __init__(self, budget_mb: float | None = None):
+        self.budget_mb = budget_mb
+        self._loaders = dict()
+        self._entries = OrderedDict()
+        self._loading = dict()
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader, paths=()):
+        """Register loader(device) as the way to load the model name, whose weights are at paths."""
+        self._loaders[name] = (loader, list(paths))
+
+    def names(self) -> list[str]:
+        return list(self._loaders)
+
+    def loaded(self) -> list[tuple[str, str]]:
+        with self._lock:
+            return list(self._entries)
+
+    def size(self, name: str) -> int:
+        loader, paths = self._loaders[name]
+        return sum(path_size(path) for path in paths if os.path.exists(path))
+
+    def acquire(self, name: str, device: str = 'cpu'):
+        """Return the model name on device, loading it if needed, and hold a reference until release()."""
+        key = (name, device)
+        loader, paths = self._loaders[name]
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry.refs += 1
+                    return entry.model
+                loading = self._loading.get(key)
+                if loading is None:
+                    # This caller loads the model, the others wait for it and look again
+                    loading = self._loading[key] = threading.Event()
+                    break
+            loading.wait()
+
+        try:
+            size = self.size(name)
+            with self._lock:
+                self._evict(size)
+            model = loader(device)
+            with self._lock:
+                entry = ModelEntry(model, size)
+                entry.refs += 1
+                self._entries[key] = entry
+                # Models loaded meanwhile may have pushed the total over budget
+                self._evict(0)
+            return model
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def release(self, name: str, device: str = 'cpu'):
+        with self._lock:
+            entry = self._entries.get((name, device))
+            if entry is not None:
+                entry.refs = max(0, entry.refs - 1)
+
+    @contextmanager
+    def use(self, name: str, device: str = 'cpu'):
+        """Hold the model name on device for the duration of the block."""
+        model = self.acquire(name, device)
+        try:
+            yield model
+        finally:
+            self.release(name, device)
+
+    def warm(self, names, device: str = 'cpu'):
+        """Load the models names ahead of their first use, skipping the ones that fail to load."""
+        for name in names:
+            try:
+                self.acquire(name, device)
+                self.release(name, device)
+            except Exception as e:
+                print(f"Error preloading {name}: {e}")
+
+    def evict(self, name: str, device: str = 'cpu') -> bool:
+        """Unload the model name on device unless it is in use. Returns whether it was unloaded."""
+        with self._lock:
+            entry = self._entries.get((name, device))
+            if entry is None or entry.refs > 0:
+                return False
+            del self._entries[(name, device)]
+        self._free_memory()
+        return True
+
+    def _evict(self, needed: int):
+        """Drop idle models, least recently used first, until needed more bytes fit in the budget."""
+        if self.budget_mb is None:
+            return
+        budget = self.budget_mb * 1024 * 1024
+        used = sum(entry.size for entry in self._entries.values())
+        evicted = False
+        for key in list(self._entries):
+            if used + needed <= budget:
+                break
+            entry = self._entries[key]
+            if entry.refs > 0:
+                continue
+            del self._entries[key]
+            used -= entry.size
+            evicted = True
+        if evicted:
+            self._free_memory()
+
+    @staticmethod
+    def _free_memory():
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+def load_text_block_detector(device):
+    from ..detection import TextBlockDetector
+    return TextBlockDetector('models/detection/comic-speech-bubble-detector.pt',
+                             'models/detection/comic-text-segmenter.pt', 'models/detection/manga-text-detector.pt',
+                             0 if device == 'cuda' else 'cpu')
+
+
+def inpainter_loader(key):
+    def load(device):
+        return inpaint_map[key](device)
+    return load
+
+
+def load_manga_ocr(device):
+    from .download import get_models, manga_ocr_data
+    from ..ocr.manga_ocr.manga_ocr import MangaOcr
+    get_models(manga_ocr_data)
+    return MangaOcr(pretrained_model_name_or_path='models/ocr/manga-ocr-base', device=device)
+
+
+def load_easyocr(device):
+    import easyocr
+    return easyocr.Reader(['en'], gpu=device != 'cpu')
+
+
+def load_pororo(device):
+    from .download import get_models, pororo_data
+    from ..ocr.pororo.main import PororoOcr
+    get_models(pororo_data)
+    return PororoOcr()
+
+
+budget_mb = os.environ.get('COMIC_TRANSLATE_MODEL_BUDGET_MB')
+model_registry = ModelRegistry(float(budget_mb) if budget_mb else None)
+
+model_registry.register('text_block_detector', load_text_block_detector, [
+    os.path.join(models_base_dir, 'detection', 'comic-speech-bubble-detector.pt'),
+    os.path.join(models_base_dir, 'detection', 'comic-text-segmenter.pt'),
+    os.path.join(models_base_dir, 'detection', 'manga-text-detector.pt'),
+])
+for key, inpainter in inpaint_map.items():
+    model_registry.register(key, inpainter_loader(key), [os.path.join(models_base_dir, 'inpainting', inpainter.model_file)])
+model_registry.register('manga_ocr', load_manga_ocr, [os.path.join(models_base_dir, 'ocr', 'manga-ocr-base')])
+model_registry.register('easyocr', load_easyocr, [os.path.join(os.path.expanduser('~'), '.EasyOCR', 'model')])
+model_registry.register('pororo', load_pororo, [os.path.join(models_base_dir, 'ocr', 'pororo')])
@@ -3,9 +3,8 @@ import numpy as np
 import os
 import base64
 from .textblock import TextBlock, sort_textblock_rectangles
-from ..detection import does_rectangle_fit, do_rectangles_overlap, is_mostly_contained
+from .box_ops import assign_lines
 from typing import List
-from ..inpainting.lama import LaMa
 from ..inpainting.schema import Config
 from app.ui.messages import Messages
 
@@ -30,10 +29,6 @@ language_codes = {
     }
 
 
-inpaint_map = {
-    "LaMa": LaMa
-}
-
 def get_config(settings_page):
     strategy_settings = settings_page.get_hd_strategy_settings()
     if strategy_settings['strategy'] == settings_page.ui.tr("Resize"):
@@ -59,22 +54,12 @@ def encode_image_array(img_array: np.ndarray):
     return base64.b64encode(img_bytes).decode('utf-8')
 
 def lists_to_blk_list(blk_list: List[TextBlock], texts_bboxes: List, texts_string: List):
-    group = list(zip(texts_bboxes, texts_string))  
+    group = list(zip(texts_bboxes, texts_string))
+    outer_boxes = [blk.bubble_xyxy if blk.bubble_xyxy is not None else blk.xyxy for blk in blk_list]
+    blk_lines = assign_lines(outer_boxes, [line for line, text in group])
 
-    for blk in blk_list:
-        blk_entries = []
-        
-        for line, text in group:
-            if blk.bubble_xyxy is not None:
-                if does_rectangle_fit(blk.bubble_xyxy, line):
-                    blk_entries.append((line, text))  
-                elif is_mostly_contained(blk.bubble_xyxy, line, 0.5):
-                    blk_entries.append((line, text)) 
-
-            elif does_rectangle_fit(blk.xyxy, line):
-                blk_entries.append((line, text)) 
-            elif is_mostly_contained(blk.xyxy, line, 0.5):
-                blk_entries.append((line, text)) 
+    for blk, lines in zip(blk_list, blk_lines):
+        blk_entries = [group[i] for i in lines]
 
         # Sort and join text entries
         sorted_entries = sort_textblock_rectangles(blk_entries, blk.source_lang_direction)
@@ -4,12 +4,12 @@ from datetime import datetime
 from typing import List
 from PySide6 import QtCore
 
-from modules.detection import TextBlockDetector
 from modules.ocr.ocr import OCRProcessor
 from modules.translator import Translator
 from modules.utils.textblock import TextBlock, sort_blk_list
 from modules.rendering.render import get_best_render_area
-from modules.utils.pipeline_utils import inpaint_map, get_config
+from modules.utils.pipeline_utils import get_config
+from modules.utils.model_registry import model_registry
 from modules.rendering.render import draw_text, get_best_render_area
 from modules.utils.pipeline_utils import generate_mask, get_language_code, set_alignment, is_directory_empty
 from modules.utils.translator_utils import get_raw_translation, get_raw_text, format_translations
@@ -20,11 +20,20 @@ from app.ui.canvas.rectangle import MovableRectItem
 class ComicTranslatePipeline:
     def __init__(self, main_page):
         self.main_page = main_page
-        self.block_detector_cache = None
-        self.inpainter_cache = None
-        self.cached_inpainter_key = None
         self.ocr = OCRProcessor()
 
+    def model_device(self) -> str:
+        return 'cuda' if self.main_page.settings_page.is_gpu_enabled() else 'cpu'
+
+    def run_detector(self, image) -> List[TextBlock]:
+        with model_registry.use('text_block_detector', self.model_device()) as detector:
+            return detector.detect(image)
+
+    def run_inpainter(self, image, mask, config):
+        inpainter_key = self.main_page.settings_page.get_tool_selection('inpainter')
+        with model_registry.use(inpainter_key, self.model_device()) as inpainter:
+            return inpainter(image, mask, config)
+
     def load_box_coords(self, blk_list: List[TextBlock]):
         self.main_page.image_viewer.clear_rectangles()
         if self.main_page.image_viewer.hasPhoto() and blk_list:
@@ -41,13 +50,8 @@ class ComicTranslatePipeline:
 
     def detect_blocks(self, load_rects=True):
         if self.main_page.image_viewer.hasPhoto():
-            if self.block_detector_cache is None:
-                device = 0 if self.main_page.settings_page.is_gpu_enabled() else 'cpu'
-                self.block_detector_cache = TextBlockDetector('models/detection/comic-speech-bubble-detector.pt', 
-                                                'models/detection/comic-text-segmenter.pt','models/detection/manga-text-detector.pt',
-                                                 device)
             image = self.main_page.image_viewer.get_cv2_image()
-            blk_list = self.block_detector_cache.detect(image)
+            blk_list = self.run_detector(image)
 
             return blk_list, load_rects
 
@@ -68,15 +72,8 @@ class ComicTranslatePipeline:
         mask = image_viewer.get_mask_for_inpainting()
         image = image_viewer.get_cv2_image()
 
-        if self.inpainter_cache is None or self.cached_inpainter_key != settings_page.get_tool_selection('inpainter'):
-            device = 'cuda' if settings_page.is_gpu_enabled() else 'cpu'
-            inpainter_key = settings_page.get_tool_selection('inpainter')
-            InpainterClass = inpaint_map[inpainter_key]
-            self.inpainter_cache = InpainterClass(device)
-            self.cached_inpainter_key = inpainter_key
-
         config = get_config(settings_page)
-        inpaint_input_img = self.inpainter_cache(image, mask, config)
+        inpaint_input_img = self.run_inpainter(image, mask, config)
         inpaint_input_img = cv2.convertScaleAbs(inpaint_input_img) 
 
         return inpaint_input_img
@@ -176,13 +173,7 @@ class ComicTranslatePipeline:
                 self.main_page.current_worker = None
                 break
 
-            if self.block_detector_cache is None:
-                bdetect_device = 0 if self.main_page.settings_page.is_gpu_enabled() else 'cpu'
-                self.block_detector_cache = TextBlockDetector('models/detection/comic-speech-bubble-detector.pt', 
-                                                            'models/detection/comic-text-segmenter.pt', 'models/detection/manga-text-detector.pt', 
-                                                            bdetect_device)
-            
-            blk_list = self.block_detector_cache.detect(image)
+            blk_list = self.run_detector(image)
 
             self.main_page.progress_update.emit(index, total_images, 2, 10, False)
             if self.main_page.current_worker and self.main_page.current_worker.is_cancelled:
@@ -214,13 +205,6 @@ class ComicTranslatePipeline:
             # Clean Image of text
             export_settings = settings_page.get_export_settings()
 
-            if self.inpainter_cache is None or self.cached_inpainter_key != settings_page.get_tool_selection('inpainter'):
-                device = 'cuda' if settings_page.is_gpu_enabled() else 'cpu'
-                inpainter_key = settings_page.get_tool_selection('inpainter')
-                InpainterClass = inpaint_map[inpainter_key]
-                self.inpainter_cache = InpainterClass(device)
-                self.cached_inpainter_key = inpainter_key
-
             config = get_config(settings_page)
             mask = generate_mask(image, blk_list)
 
@@ -229,7 +213,7 @@ class ComicTranslatePipeline:
                 self.main_page.current_worker = None
                 break
 
-            inpaint_input_img = self.inpainter_cache(image, mask, config)
+            inpaint_input_img = self.run_inpainter(image, mask, config)
             inpaint_input_img = cv2.convertScaleAbs(inpaint_input_img)
 
             # Saving cleaned image
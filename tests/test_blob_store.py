@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from toonkor_collector2.blob_store import BlobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(tmp_path / "blobs")
+
+
+def page(tmp_path, name: str, content: bytes) -> str:
+    path = tmp_path / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_identical_pages_share_one_blob(store, tmp_path):
+    first = page(tmp_path, "a/1.PNG", b"credits")
+    second = page(tmp_path, "b/7.png", b"credits")
+    other = page(tmp_path, "b/8.png", b"story")
+
+    blob = store.store(first)
+    assert store.store(second) == blob
+    assert blob.endswith(".png")
+    assert store.store(other) != blob
+
+    assert os.path.samefile(first, store.path(blob)) and os.path.samefile(second, store.path(blob))
+    assert os.stat(store.path(blob)).st_nlink == 3
+    with open(second, "rb") as file:
+        assert file.read() == b"credits"
+
+
+def test_storing_the_same_page_twice_adds_no_link(store, tmp_path):
+    path = page(tmp_path, "a/1.png", b"credits")
+    blob = store.store(path)
+    assert store.store(path) == blob
+    assert os.stat(store.path(blob)).st_nlink == 2
+
+
+def test_release_deletes_blobs_once_unlinked(store, tmp_path):
+    first = page(tmp_path, "a/1.png", b"credits")
+    second = page(tmp_path, "b/1.png", b"credits")
+    blob = store.store(first)
+    store.store(second)
+
+    os.remove(first)
+    store.release([blob])
+    assert os.path.exists(store.path(blob))
+
+    os.remove(second)
+    store.release([blob, blob, "missing.png"])
+    assert not os.path.exists(store.path(blob))
+
+
+def test_failed_swap_leaves_no_temporary_link(store, tmp_path, monkeypatch):
+    first = page(tmp_path, "a/1.png", b"credits")
+    second = page(tmp_path, "b/1.png", b"credits")
+    blob = store.store(first)
+
+    def replace(src, dst):
+        raise OSError("replace failed")
+
+    monkeypatch.setattr(os, "replace", replace)
+    assert store.store(second) is None
+    assert os.listdir(tmp_path / "b") == ["1.png"]
+    assert os.stat(store.path(blob)).st_nlink == 2
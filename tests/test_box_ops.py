@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from modules.detection import (
+    calculate_iou, does_rectangle_fit, is_mostly_contained, merge_bounding_boxes, merge_tiled_boxes
+)
+from modules.utils import box_ops
+
+
+def random_boxes(rng, count, size=400):
+    # Boxes clustered on a small page so that many of them overlap, nest or repeat
+    x1 = rng.integers(0, size, count)
+    y1 = rng.integers(0, size, count)
+    w = rng.integers(1, size // 2, count)
+    h = rng.integers(1, size // 4, count)
+    boxes = np.stack([x1, y1, x1 + w, y1 + h], axis=1).astype("int")
+    if count > 2:
+        boxes[-1] = boxes[0]
+    return boxes
+
+
+def combine_reference(text_boxes, bubble_boxes):
+    results = []
+    for txt_box in text_boxes:
+        match = (None, 'text_free')
+        for j, bble_box in enumerate(bubble_boxes):
+            if does_rectangle_fit(bble_box, txt_box):
+                match = (j, 'text_bubble')
+                break
+            elif calculate_iou(bble_box, txt_box) >= 0.2:
+                match = (j, 'text_free')
+                break
+        results.append(match)
+    return results
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_pairwise_matrices_match_scalar_functions(seed):
+    rng = np.random.default_rng(seed)
+    a, b = random_boxes(rng, 7), random_boxes(rng, 9)
+
+    iou = box_ops.pairwise_iou(a, b)
+    fits = box_ops.pairwise_fits(a, b)
+    contained = box_ops.pairwise_mostly_contained(a, b, 0.5)
+    for i in range(len(a)):
+        for j in range(len(b)):
+            assert iou[i, j] == calculate_iou(a[i], b[j])
+            assert fits[i, j] == does_rectangle_fit(a[i], b[j])
+            assert contained[i, j] == is_mostly_contained(a[i], b[j], 0.5)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_merge_bounding_boxes_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    seg_boxes = random_boxes(rng, int(rng.integers(0, 8)))
+    detect_boxes = random_boxes(rng, int(rng.integers(0, 15)))
+
+    expected = merge_bounding_boxes(seg_boxes, detect_boxes)
+    result = box_ops.merge_bounding_boxes(seg_boxes, detect_boxes)
+    assert result.shape == expected.shape
+    assert result.dtype == expected.dtype
+    assert np.array_equal(result, expected)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_match_bubbles_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    text_boxes = random_boxes(rng, int(rng.integers(0, 12)))
+    bubble_boxes = random_boxes(rng, int(rng.integers(0, 6)))
+
+    assert box_ops.match_bubbles(text_boxes, bubble_boxes) == combine_reference(text_boxes, bubble_boxes)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_assign_lines_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    outer_boxes = random_boxes(rng, int(rng.integers(0, 6)))
+    lines = [tuple(int(v) for v in line) for line in random_boxes(rng, int(rng.integers(0, 12)))]
+
+    expected = [
+        [j for j, line in enumerate(lines) if does_rectangle_fit(outer, line) or is_mostly_contained(outer, line, 0.5)]
+        for outer in outer_boxes
+    ]
+    assert box_ops.assign_lines(outer_boxes, lines) == expected
+
+
+def test_merge_tiled_boxes_keeps_whole_box_over_cut_fragment():
+    # Tile 0 cuts the block at its bottom edge with a higher score than the whole block found in tile 1
+    tile_boxes = [np.array([[100, 700, 300, 800]]), np.array([[100, 100, 300, 300]])]
+    tile_scores = [np.array([0.9]), np.array([0.8])]
+
+    result = merge_tiled_boxes(tile_boxes, tile_scores, [(0, 800), (600, 1400)])
+    assert result.tolist() == [[100, 700, 300, 900]]
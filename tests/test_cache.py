@@ -0,0 +1,27 @@
+import time
+
+from toonkor_collector2.cache import TTLCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(2, 60)
+    cache["a"], cache["b"] = 1, 2
+    assert cache["a"] == 1
+    cache["c"] = 3
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_expired_entry_is_dropped(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = TTLCache(10, 60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=600)
+
+    now += 120
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
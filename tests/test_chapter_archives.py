@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from PIL import Image
+
+from toonkor_collector2.chapter_archives import archive_path, pack_chapter
+from toonkor_collector2.jobs import reconcile_jobs
+from toonkor_collector2.models import Chapter, StatusChoices
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def chapter(tmp_path, monkeypatch):
+    # Chapter paths are relative to the project folder
+    monkeypatch.chdir(tmp_path)
+    chapter = Chapter.objects.create(
+        manhwa_id="manhwa", index=0,
+        download_status=StatusChoices.LOADING, translation_status=StatusChoices.LOADING,
+    )
+    os.makedirs(chapter.translated_path)
+    for index, height in enumerate((300, 200), start=1):
+        Image.new("RGB", (100, height)).save(os.path.join(chapter.downloaded_path, f"{index}.png"))
+        Image.new("RGB", (100, height)).save(os.path.join(chapter.translated_path, f"{index}.png"))
+    # Leftovers that are not pages keep the chapter folder alive after packing
+    with open(os.path.join(chapter.downloaded_path, "skipped_images.txt"), "w") as file:
+        file.write("")
+    return chapter
+
+
+def test_manifest_of_packed_chapter_with_leftover_folder(chapter):
+    expected = [
+        {"name": "1.png", "width": 100, "height": 300, "size": os.path.getsize(os.path.join(chapter.downloaded_path, "1.png"))},
+        {"name": "2.png", "width": 100, "height": 200, "size": os.path.getsize(os.path.join(chapter.downloaded_path, "2.png"))},
+    ]
+    assert pack_chapter(chapter.downloaded_path, Chapter.is_page)
+    assert os.path.isfile(archive_path(chapter.downloaded_path))
+    assert os.path.isdir(chapter.downloaded_path)
+
+    assert Chapter.build_manifest(chapter.downloaded_path) == expected
+    assert [page["name"] for page in Chapter.build_manifest(chapter.translated_path)] == ["1.png", "2.png"]
+
+
+def test_reconcile_keeps_packed_chapter_ready(chapter):
+    assert pack_chapter(chapter.downloaded_path, Chapter.is_page)
+
+    reconcile_jobs()
+
+    chapter.refresh_from_db()
+    assert chapter.download_status == StatusChoices.READY
+    assert chapter.translation_status == StatusChoices.READY
+    assert [page["name"] for page in chapter.download_manifest] == ["1.png", "2.png"]
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from toonkor_collector2.host_slots import HostSlots
+
+
+URL = "https://toonkor.example/page.jpg"
+
+
+def test_threads_and_coroutines_share_the_budget():
+    slots = HostSlots(2)
+    active, peak = [], []
+    lock = threading.Lock()
+
+    def enter():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+
+    def leave():
+        with lock:
+            active.pop()
+
+    def fetch_sync():
+        with slots.hold(URL):
+            enter()
+            threading.Event().wait(0.05)
+            leave()
+
+    async def fetch_async():
+        async with slots.hold_async(URL):
+            enter()
+            await asyncio.sleep(0.05)
+            leave()
+
+    async def main():
+        await asyncio.gather(*(fetch_async() for _ in range(4)))
+
+    threads = [threading.Thread(target=fetch_sync) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    asyncio.run(main())
+    for thread in threads:
+        thread.join(5)
+
+    assert len(peak) == 8
+    assert max(peak) == 2
+    assert slots._used == {}
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    slots = HostSlots(1)
+
+    async def main():
+        await slots.acquire_async("host")
+        waiter = asyncio.ensure_future(slots.acquire_async("host"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        slots.release("host")
+        await asyncio.wait_for(slots.acquire_async("host"), 1)
+        slots.release("host")
+
+    asyncio.run(main())
+    assert slots._used == {}
@@ -0,0 +1,42 @@
+import os
+import time
+
+from toonkor_collector2.http_cache import HttpCache
+
+
+def stored(cache, url, body, age=0):
+    cache.store(url, {}, body)
+    stored_at = time.time() - age
+    os.utime(cache.path(url), (stored_at, stored_at))
+
+
+def test_prune_drops_entries_past_max_age(tmp_path):
+    cache = HttpCache(tmp_path, {}, max_age=60)
+    stored(cache, "https://example.com/old", "old", age=120)
+    stored(cache, "https://example.com/new", "new")
+
+    assert cache.prune() == 1
+    assert cache.load("https://example.com/old") is None
+    assert cache.load("https://example.com/new")["body"] == "new"
+
+
+def test_prune_drops_oldest_entries_over_max_bytes(tmp_path):
+    cache = HttpCache(tmp_path, {})
+    for age, name in ((30, "a"), (20, "b"), (10, "c")):
+        stored(cache, f"https://example.com/{name}", name * 1000, age=age)
+    cache.max_bytes = os.path.getsize(cache.path("https://example.com/c")) * 2
+
+    assert cache.prune() == 1
+    assert cache.load("https://example.com/a") is None
+    assert [cache.load(f"https://example.com/{name}")["body"] for name in "bc"] == ["b" * 1000, "c" * 1000]
+
+
+def test_store_prunes_once_per_interval(tmp_path):
+    cache = HttpCache(tmp_path, {}, max_age=60, prune_interval=3600)
+    stored(cache, "https://example.com/old", "old", age=120)
+    cache.store("https://example.com/new", {}, "new")
+    assert cache.load("https://example.com/old") is not None
+
+    cache.prune_interval = 0
+    cache.store("https://example.com/new", {}, "new")
+    assert cache.load("https://example.com/old") is None
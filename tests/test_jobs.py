@@ -0,0 +1,138 @@
+import pytest
+
+from toonkor_collector2.downloader import Downloader
+from toonkor_collector2.jobs import (
+    MAX_ATTEMPTS, batch_progress, complete_job, complete_jobs, fail_exhausted_jobs, fail_job, lease_batch, lease_job,
+    reconcile_jobs, renew_leases,
+)
+from toonkor_collector2.models import Chapter, Job, JobStateChoices, StatusChoices
+
+
+pytestmark = pytest.mark.django_db
+
+
+def make_job(batch="batch", index=0, task="download") -> Job:
+    return Job.objects.create(
+        task=task, batch=batch, group_name="group", manhwa_id="manhwa", chapter_index=index, chapter={"index": index}
+    )
+
+
+def test_lease_claims_queued_job_once():
+    make_job()
+
+    job = lease_job(("download",))
+    assert job.state == JobStateChoices.RUNNING
+    assert job.attempts == 1
+    assert lease_job(("download",)) is None
+
+
+def test_expired_lease_is_claimed_again():
+    make_job()
+    stale = lease_job(("download",), lease_seconds=-1)
+
+    job = lease_job(("download",))
+    assert job is not None and job.pk == stale.pk
+    assert job.attempts == 2
+    assert job.lease_expires_at != stale.lease_expires_at
+
+
+def test_stale_worker_cannot_complete_or_fail():
+    make_job()
+    stale = lease_job(("download",), lease_seconds=-1)
+    owner = lease_job(("download",))
+
+    assert not complete_job(stale)
+    assert fail_job(stale, "too late")
+    job = Job.objects.get(pk=owner.pk)
+    assert job.state == JobStateChoices.RUNNING
+    assert job.lease_expires_at == owner.lease_expires_at
+    assert job.error == ""
+
+    assert complete_job(owner)
+    assert Job.objects.get(pk=owner.pk).state == JobStateChoices.DONE
+
+
+def test_renewed_lease_is_not_claimed_and_still_completes():
+    make_job()
+    job = lease_job(("download",), lease_seconds=-1)
+
+    assert renew_leases([job]) == []
+    assert lease_job(("download",)) is None
+    assert complete_job(job)
+
+
+def test_renewing_a_lost_lease_fails():
+    make_job()
+    stale = lease_job(("download",), lease_seconds=-1)
+    owner = lease_job(("download",))
+
+    assert renew_leases([stale]) == [stale]
+    assert Job.objects.get(pk=owner.pk).lease_expires_at == owner.lease_expires_at
+
+
+def test_complete_jobs_skips_jobs_whose_lease_was_lost():
+    for index in range(3):
+        make_job(index=index, task="remove")
+    job = lease_job(("remove",))
+    jobs = [job] + lease_batch(job, lease_seconds=-1)
+    assert len(jobs) == 3
+
+    # Another worker claims the expired batch jobs
+    taken = [lease_job(("remove",)), lease_job(("remove",))]
+    assert {other.pk for other in taken} == {other.pk for other in jobs[1:]}
+
+    assert complete_jobs(jobs) == 1
+    assert Job.objects.get(pk=job.pk).state == JobStateChoices.DONE
+    assert all(Job.objects.get(pk=other.pk).state == JobStateChoices.RUNNING for other in taken)
+
+
+def test_expired_last_attempt_is_failed_instead_of_leased():
+    make_job()
+    for _ in range(MAX_ATTEMPTS):
+        stale = lease_job(("download",), lease_seconds=-1)
+    assert stale.attempts == MAX_ATTEMPTS
+
+    assert lease_job(("download",)) is None
+    assert fail_exhausted_jobs(("download",)) == [stale]
+    job = Job.objects.get(pk=stale.pk)
+    assert job.state == JobStateChoices.FAILED
+    assert job.error
+
+
+def test_reconcile_requeues_expired_jobs_until_their_last_attempt():
+    make_job(index=0)
+    make_job(index=1)
+    retried = lease_job(("download",), lease_seconds=-1)
+    exhausted = Job.objects.exclude(pk=retried.pk).get()
+    Job.objects.filter(pk=exhausted.pk).update(state=JobStateChoices.RUNNING, attempts=MAX_ATTEMPTS, lease_expires_at=retried.lease_expires_at)
+
+    reconcile_jobs()
+    assert Job.objects.get(pk=retried.pk).state == JobStateChoices.QUEUED
+    assert Job.objects.get(pk=exhausted.pk).state == JobStateChoices.FAILED
+
+
+def test_downloaded_chapter_queues_its_translation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Chapter.objects.create(manhwa_id="manhwa", index=0, translation_status=StatusChoices.LOADING)
+    make_job(task="download_translate")
+    job = lease_job(("download_translate",))
+
+    assert Downloader._finish(job, ["0/1.png"])
+    translate = Job.objects.get(task="translate")
+    assert (translate.batch, translate.chapter_index, translate.state) == (job.batch, 0, JobStateChoices.QUEUED)
+    assert translate.chapter["page_paths"] == ["0/1.png"]
+    assert batch_progress(job.batch, "download_translate") == {"current": 1, "total": 1}
+    assert batch_progress(job.batch, "translate") == {"current": 0, "total": 1}
+
+    # The chapter waiting for its translation is left as it is across a restart
+    reconcile_jobs()
+    assert Chapter.objects.get(index=0).translation_status == StatusChoices.LOADING
+
+
+def test_lost_download_lease_queues_no_translation():
+    make_job(task="download_translate")
+    stale = lease_job(("download_translate",), lease_seconds=-1)
+    lease_job(("download_translate",))
+
+    assert not Downloader._finish(stale, ["0/1.png"])
+    assert not Job.objects.filter(task="translate").exists()
@@ -0,0 +1,52 @@
+import pytest
+
+from toonkor_collector2.api import decode_cursor, encode_cursor
+from toonkor_collector2.models import Manhwa
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def manhwas():
+    # Titles repeat so that pages have to break ties on id
+    return [
+        Manhwa.objects.create(title=title, toonkor_id=f"manhwa-{index}")
+        for index, title in enumerate(("b", "a", "b", "a", "c", "b"))
+    ]
+
+
+def pages(client, **params):
+    cursor, results = None, []
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/library", query)
+        assert response.status_code == 200
+        results.append([item["toonkor_id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return results
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(["title", 3])) == ["title", 3]
+
+
+@pytest.mark.parametrize("order", ["id", "title", "-title"])
+def test_pages_follow_order_with_ties(client, manhwas, order):
+    field = order.lstrip("-")
+    expected = sorted(manhwas, key=lambda manhwa: (getattr(manhwa, field), manhwa.id), reverse=order.startswith("-"))
+
+    results = pages(client, limit=2, order=order, fields="toonkor_id")
+    assert [len(page) for page in results] == [2, 2, 2]
+    assert sum(results, []) == [manhwa.toonkor_id for manhwa in expected]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "bm90IGpzb24=", "WzFd", "eyJhIjogMX0="])
+def test_malformed_cursor_is_rejected(client, manhwas, cursor):
+    assert client.get("/api/library", {"cursor": cursor}).status_code == 400
+
+
+@pytest.mark.parametrize("limit", [0, -1, 100000])
+def test_limit_out_of_range_is_rejected(client, manhwas, limit):
+    assert client.get("/api/library", {"limit": limit}).status_code == 422
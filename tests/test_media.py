@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from django.test import RequestFactory
+
+from toonkor_collector2.media import file_etag, parse_range, serve_file
+
+
+@pytest.fixture
+def page(tmp_path):
+    path = tmp_path / "1.png"
+    path.write_bytes(bytes(range(100)))
+    return str(path)
+
+
+def serve(path, **headers):
+    request = RequestFactory().get("/media/1.png", headers=headers)
+    return serve_file(request, path)
+
+
+def body(response) -> bytes:
+    return b"".join(response.streaming_content)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-1000", (0, 99)),
+    ("bytes=50-1000", (50, 99)),
+    ("bytes=100-", None),
+    ("bytes=10-5", None),
+    ("bytes=-0", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+def test_etag_and_if_none_match(page):
+    response = serve(page)
+    assert response.status_code == 200
+    assert response["ETag"] == file_etag(os.stat(page))
+    assert body(response) == bytes(range(100))
+
+    assert serve(page, if_none_match=response["ETag"]).status_code == 304
+    assert serve(page, if_none_match=f'"other", {response["ETag"]}').status_code == 304
+    assert serve(page, if_none_match="*").status_code == 304
+    assert serve(page, if_none_match='"other"').status_code == 200
+
+
+def test_single_range(page):
+    response = serve(page, range="bytes=10-19")
+    assert response.status_code == 206
+    assert response["Content-Range"] == "bytes 10-19/100"
+    assert response["Content-Length"] == "10"
+    assert body(response) == bytes(range(10, 20))
+
+
+def test_unsatisfiable_range(page):
+    response = serve(page, range="bytes=200-")
+    assert response.status_code == 416
+    assert response["Content-Range"] == "bytes */100"
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-6", "items=0-1"])
+def test_unsupported_range_gets_whole_file(page, header):
+    response = serve(page, range=header)
+    assert response.status_code == 200
+    assert body(response) == bytes(range(100))
+
+
+def test_if_range_mismatch_gets_whole_file(page):
+    response = serve(page, range="bytes=10-19", if_range='"stale"')
+    assert response.status_code == 200
+    assert body(response) == bytes(range(100))
+
+
+def test_archive_member_range(page):
+    request = RequestFactory().get("/media/2.png", headers={"range": "bytes=2-4"})
+    response = serve_file(request, page, member=("2.png", 50, 20))
+    assert response.status_code == 206
+    assert response["Content-Range"] == "bytes 2-4/20"
+    assert body(response) == bytes(range(52, 55))
@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.utils.model_registry import ModelRegistry
+
+
+def test_slow_load_does_not_block_other_models():
+    registry = ModelRegistry()
+    started, finish = threading.Event(), threading.Event()
+
+    def load_slow(device):
+        started.set()
+        finish.wait(5)
+        return "slow"
+
+    registry.register("slow", load_slow)
+    registry.register("fast", lambda device: "fast")
+
+    with ThreadPoolExecutor(1) as executor:
+        slow = executor.submit(registry.acquire, "slow")
+        assert started.wait(5)
+        assert registry.acquire("fast") == "fast"
+        finish.set()
+        assert slow.result(5) == "slow"
+    assert sorted(registry.loaded()) == [("fast", "cpu"), ("slow", "cpu")]
+
+
+def test_concurrent_acquires_load_once():
+    registry = ModelRegistry()
+    calls = []
+    finish = threading.Event()
+
+    def load(device):
+        calls.append(device)
+        finish.wait(5)
+        return object()
+
+    registry.register("model", load)
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(registry.acquire, "model") for _ in range(4)]
+        finish.set()
+        models = [future.result(5) for future in futures]
+
+    assert len(calls) == 1
+    assert all(model is models[0] for model in models)
+    assert registry._entries[("model", "cpu")].refs == 4
+
+
+def test_failed_load_lets_next_caller_retry():
+    registry = ModelRegistry()
+    attempts = []
+
+    def load(device):
+        attempts.append(device)
+        if len(attempts) == 1:
+            raise RuntimeError("missing weights")
+        return "model"
+
+    registry.register("model", load)
+    try:
+        registry.acquire("model")
+    except RuntimeError:
+        pass
+    assert registry.acquire("model") == "model"
+    assert len(attempts) == 2
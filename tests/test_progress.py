@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from toonkor_collector2.channel_layers import LocalChannelLayer
+from toonkor_collector2.event_loop import background_loop
+from toonkor_collector2.progress import ProgressAggregator
+
+
+GROUP = "manhwa-progress"
+CHANNEL = "test.progress"
+
+
+@pytest.fixture
+def aggregator(settings):
+    settings.PROGRESS_FLUSH_RATE = 5
+    aggregator = ProgressAggregator()
+    aggregator._channel_layer = LocalChannelLayer()
+    background_loop.run(aggregator._channel_layer.group_add(GROUP, CHANNEL))
+    return aggregator
+
+
+def receive(aggregator, timeout: float = 1) -> dict:
+    return background_loop.run(asyncio.wait_for(aggregator._channel_layer.receive(CHANNEL), timeout))
+
+
+def nothing_received(aggregator) -> bool:
+    try:
+        receive(aggregator, 0.5)
+    except asyncio.TimeoutError:
+        return True
+    return False
+
+
+def test_updates_between_flushes_are_coalesced(aggregator):
+    aggregator.push(GROUP, [{"index": 1, "download_status": "LOADING"}])
+    assert receive(aggregator)["chapters"] == [{"index": 1, "download_status": "LOADING"}]
+
+    first_flush = aggregator._last_flush[GROUP]
+    aggregator.push(GROUP, [{"index": 1, "download_status": "READY"}, {"index": 2, "download_status": "LOADING"}])
+    aggregator.push(GROUP, [{"index": 2, "download_status": "READY"}], progress={"current": 2, "total": 3})
+    event = receive(aggregator)
+
+    # At most PROGRESS_FLUSH_RATE flushes a second
+    assert time.monotonic() - first_flush >= 0.19
+    assert event == {
+        "type": "send_progress",
+        "chapters": [{"index": 1, "download_status": "READY"}, {"index": 2, "download_status": "READY"}],
+        "progress": {"current": 2, "total": 3},
+    }
+    assert nothing_received(aggregator)
+
+
+def test_unchanged_chapters_are_not_sent_again(aggregator):
+    aggregator.push(GROUP, [{"index": 1, "download_status": "READY", "translation_status": "NOT_READY"}])
+    receive(aggregator)
+
+    aggregator.push(GROUP, [{"index": 1, "download_status": "READY"}])
+    assert nothing_received(aggregator)
+
+    aggregator.push(GROUP, [{"index": 1, "translation_status": "LOADING"}])
+    assert receive(aggregator)["chapters"] == [{"index": 1, "download_status": "READY", "translation_status": "LOADING"}]
+
+
+def test_complete_batch_is_flushed_and_forgotten(aggregator):
+    aggregator.push(GROUP, [{"index": 1, "download_status": "LOADING"}])
+    receive(aggregator)
+
+    aggregator.push(GROUP, [{"index": 1, "download_status": "READY"}], progress={"current": 1, "total": 1})
+    assert receive(aggregator)["progress"] == {"current": 1, "total": 1}
+    assert GROUP not in aggregator._sent
+
+    # The next batch starts from scratch, so an unchanged status is sent again
+    aggregator.push(GROUP, [{"index": 1, "download_status": "READY"}], final=True)
+    assert receive(aggregator)["chapters"] == [{"index": 1, "download_status": "READY"}]
@@ -0,0 +1,53 @@
+import pytest
+
+from toonkor_collector2.models import Chapter, StatusChoices
+from toonkor_collector2.status_writer import StatusWriter
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def writer(settings):
+    # Keep the background flush out of the way, the tests flush explicitly
+    settings.STATUS_FLUSH_INTERVAL = 3600
+    return StatusWriter()
+
+
+@pytest.fixture
+def chapters():
+    return [Chapter.objects.create(manhwa_id="manhwa", index=index) for index in range(3)]
+
+
+def test_updates_are_coalesced_per_chapter(writer, chapters):
+    writer.update("manhwa", 0, download_status=StatusChoices.LOADING)
+    writer.update("manhwa", "0", download_status=StatusChoices.READY, download_manifest=[{"name": "1.png"}])
+    writer.update("manhwa", 1, translation_status=StatusChoices.LOADING)
+
+    assert len(writer._pending) == 2
+    assert Chapter.objects.get(index=0).download_status == StatusChoices.NOT_READY
+
+
+def test_flush_writes_pending_updates(writer, chapters):
+    writer.update("manhwa", 0, download_status=StatusChoices.LOADING)
+    writer.update("manhwa", 0, download_status=StatusChoices.READY, download_manifest=[{"name": "1.png"}])
+    writer.update("manhwa", 1, translation_status=StatusChoices.LOADING)
+    writer.update("missing", 0, download_status=StatusChoices.READY)
+    writer.flush()
+
+    first, second, third = (Chapter.objects.get(index=index) for index in range(3))
+    assert (first.download_status, first.download_manifest) == (StatusChoices.READY, [{"name": "1.png"}])
+    assert first.translation_status == StatusChoices.NOT_READY
+    assert (second.download_status, second.translation_status) == (StatusChoices.NOT_READY, StatusChoices.LOADING)
+    assert (third.download_status, third.translation_status) == (StatusChoices.NOT_READY, StatusChoices.NOT_READY)
+    assert writer._pending == {}
+
+
+def test_flush_spans_several_chunks(writer, monkeypatch):
+    monkeypatch.setattr(StatusWriter, "chunk_size", 2)
+    Chapter.objects.bulk_create([Chapter(manhwa_id="manhwa", index=index) for index in range(5)])
+    for index in range(5):
+        writer.update("manhwa", index, download_status=StatusChoices.READY)
+    writer.flush()
+
+    assert set(Chapter.objects.values_list("download_status", flat=True)) == {StatusChoices.READY}
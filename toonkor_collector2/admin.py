@@ -1,8 +1,9 @@
 from django.contrib import admin
-from toonkor_collector2.models import Manhwa, Chapter
+from toonkor_collector2.models import Manhwa, Chapter, Job
 
 # Register your models here.
 
 
 admin.site.register(Manhwa)
 admin.site.register(Chapter)
+admin.site.register(Job)
@@ -1,21 +1,32 @@
 import re
 import os
+import json
+import base64
+import binascii
 import multiprocessing
 
-from ninja import NinjaAPI
+from ninja import NinjaAPI, Query
+from ninja.errors import HttpError
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.forms.models import model_to_dict
+from django.http import HttpResponse
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from toonkor_collector2.models import Manhwa, Chapter, ToonkorSettings
-from toonkor_collector2.schemas import ChapterPaginationSchema, ChapterSchema, ManhwaSchema, SetToonkorUrlSchema, ResponseToonkorUrlSchema
-from toonkor_collector2.mangadex_api import mangadex_api
-from toonkor_collector2.toonkor_api import toonkor_api
+from toonkor_collector2.cache import TTLCache
+from toonkor_collector2.models import Manhwa, Chapter, StatusChoices, ToonkorSettings
+from toonkor_collector2.schemas import ChapterPaginationSchema, ChapterSchema, LibraryManhwaSchema, ManhwaSchema, SetToonkorUrlSchema, ResponseToonkorUrlSchema
+from toonkor_collector2.event_loop import background_loop
+from toonkor_collector2.mangadex_api import async_mangadex_api, mangadex_api
+from toonkor_collector2.toonkor_api import async_toonkor_api, toonkor_api
+from toonkor_collector2.status_writer import status_writer
 
 
 api = NinjaAPI()
 default_value = ManhwaSchema
-cached_manhwas = dict()
+cached_manhwas = TTLCache(settings.MANHWA_CACHE_SIZE, settings.MANHWA_CACHE_TTL)
 comic_proc = None
 
 
@@ -24,12 +35,16 @@ def start_comic_proc():
     global comic_proc
     if comic_proc is None or not comic_proc.is_alive():
         ready_event = multiprocessing.Event()
-        comic_proc = multiprocessing.Process(target=run_comic_translate, args=(ready_event,))
+        comic_proc = multiprocessing.Process(target=run_comic_translate, args=(ready_event, str(settings.COMIC_TRANSLATE_SETTINGS)))
         comic_proc.daemon = True
         comic_proc.start()
         ready_event.wait()
 
 
+def comic_proc_alive() -> bool:
+    return comic_proc is not None and comic_proc.is_alive()
+
+
 def is_valid_url(url):
     validator = URLValidator()
     try:
@@ -79,17 +94,19 @@ def database_chapters_to_list(chapters_db: dict):
 
 def update_cached_chapter(toonkor_id: str, chapter_index: int, key: str, value) -> bool:
     try:
-        if not cached_manhwas.get(toonkor_id):
-            get_manhwa_details(toonkor_id)
-        
-        cached_chapters = cached_manhwas[toonkor_id]['chapters']
+        manhwa = cached_manhwas.get(toonkor_id)
+        if manhwa is None:
+            manhwa = get_manhwa_details(toonkor_id)
+
+        with cached_manhwas.lock:
+            cached_chapters = manhwa['chapters']
+
+            if isinstance(cached_chapters, dict):
+                if chapter_index in cached_chapters:
+                    cached_chapters[chapter_index][key] = value
 
-        if isinstance(cached_chapters, dict):
-            if chapter_index in cached_chapters:
+            elif isinstance(cached_chapters, list):
                 cached_chapters[chapter_index][key] = value
-                    
-        elif isinstance(cached_chapters, list):
-            cached_chapters[chapter_index][key] = value
 
         return True
     except Exception as e:
@@ -117,9 +134,10 @@ def update_manhwa_from_mangadex(manhwa: dict, manhwa_db: Manhwa | None):
 
 def get_manhwa_details(toonkor_id: str) -> dict:
     """Get Manhwa details from Toonkor API and update using Mangadex if needed."""
-    if toonkor_id in cached_manhwas:
-        return cached_manhwas[toonkor_id]
-    
+    manhwa = cached_manhwas.get(toonkor_id)
+    if manhwa is not None:
+        return manhwa
+
     manhwa = {}
     manhwa_db = search_database(toonkor_id)
 
@@ -175,18 +193,118 @@ def remove_manhwa_from_library(toonkor_id: str) -> bool:
     """Remove a Manhwa from the library and update the cache."""
     try:
         Manhwa.objects.filter(toonkor_id=toonkor_id).delete()
-        if toonkor_id in cached_manhwas:
-            cached_manhwas[toonkor_id]["in_library"] = False
+        manhwa = cached_manhwas.get(toonkor_id)
+        if manhwa is not None:
+            manhwa["in_library"] = False
         return True
     except Exception as e:
         print(f"Error removing Manhwa from library: {e}")
         return False
 
 
-@api.get("/library", response=list[ManhwaSchema])
-def library(request):
-    """Retrieve all Manhwa in the library."""
-    return Manhwa.objects.all()
+library_fields = ("title", "description", "en_title", "en_description", "thumbnail", "mangadex_id", "toonkor_id")
+library_orderings = ("id", "title", "en_title")
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    """The [value, id] pair of an encoded cursor, raises ValueError when it is malformed."""
+    try:
+        last_value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(last_id, int):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return [last_value, last_id]
+
+
+def chapter_count(**filters) -> Coalesce:
+    """Subquery counting the chapters of the outer Manhwa matching filters."""
+    chapters = (
+        Chapter.objects.filter(manhwa_id=OuterRef("toonkor_id"), **filters)
+        .order_by()
+        .values("manhwa_id")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return Coalesce(Subquery(chapters, output_field=IntegerField()), Value(0))
+
+
+@api.get("/library", response=list[LibraryManhwaSchema], exclude_unset=True)
+def library(
+    request,
+    response: HttpResponse,
+    limit: int | None = Query(None, ge=1, le=settings.LIBRARY_PAGE_MAX),
+    cursor: str | None = None,
+    order: str = "id",
+    fields: str | None = None,
+    query: str | None = None,
+    counts: bool = False,
+):
+    """
+    Retrieve the Manhwa in the library.
+
+    Pages are keyed on (order, id): pass the X-Next-Cursor header of a response
+    as cursor to get the next one. order may be prefixed with "-" to sort
+    descending, fields is a comma separated projection and counts adds
+    chapter, download and translation counts computed in the same query.
+    """
+    descending = order.startswith("-")
+    order_field = order.lstrip("-")
+    if order_field not in library_orderings:
+        order_field = "id"
+
+    selected = library_fields
+    if fields:
+        selected = tuple(field for field in library_fields if field in fields.split(","))
+
+    manhwas = Manhwa.objects.all()
+    if query:
+        manhwas = manhwas.filter(Q(title__icontains=query) | Q(en_title__icontains=query))
+    if counts:
+        manhwas = manhwas.annotate(
+            chapters_count=chapter_count(),
+            downloaded_count=chapter_count(download_status=StatusChoices.READY),
+            translated_count=chapter_count(translation_status=StatusChoices.READY),
+        )
+
+    if cursor:
+        try:
+            last_value, last_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        after = "lt" if descending else "gt"
+        manhwas = manhwas.filter(
+            Q(**{f"{order_field}__{after}": last_value}) | Q(**{order_field: last_value, f"id__{after}": last_id})
+        )
+
+    prefix = "-" if descending else ""
+    manhwas = manhwas.order_by(f"{prefix}{order_field}", f"{prefix}id")
+
+    columns = {*selected, "id", order_field}
+    if counts:
+        columns.update(("chapters_count", "downloaded_count", "translated_count"))
+    rows = list(manhwas.values(*columns)[:limit + 1] if limit else manhwas.values(*columns))
+
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response["X-Next-Cursor"] = encode_cursor([rows[-1][order_field], rows[-1]["id"]])
+
+    output = []
+    for row in rows:
+        item = {field: row[field] for field in selected}
+        if "thumbnail" in item:
+            item["thumbnail"] = f"{settings.MEDIA_URL}{item['thumbnail']}" if item["thumbnail"] else ""
+        if not fields:
+            item["chapters"] = []
+            item["in_library"] = True
+        if counts:
+            item.update({key: row[key] for key in ("chapters_count", "downloaded_count", "translated_count")})
+        output.append(item)
+    return output
 
 
 @api.get("/manhwa", response=ManhwaSchema)
@@ -195,6 +313,15 @@ def manhwa(request, toonkor_id: str):
     return get_manhwa_details(toonkor_id)
 
 
+async def search_manhwas(query: str, mangadex_id: str | None = None) -> list[ManhwaSchema]:
+    """MangaDex results for query, or for mangadex_id, completed with their Toonkor match on the background loop."""
+    if mangadex_id is not None:
+        results = await async_mangadex_api.search_by_id(mangadex_id)
+    else:
+        results = await async_mangadex_api.search(query)
+    return await async_toonkor_api.multi_update_mangadex_search(results)
+
+
 @api.get("/browse/search")
 def browse(request, query: str):
     """Search for Manhwa using Mangadex API and update with Toonkor API."""
@@ -205,11 +332,9 @@ def browse(request, query: str):
             if toonkor_slug is not None:
                 return [get_manhwa_details(toonkor_slug)]
             elif mangadex_id is not None:
-                results = mangadex_api.search_by_id(mangadex_id)
-                return toonkor_api.multi_update_mangadex_search(results)
+                return background_loop.run(search_manhwas(query, mangadex_id))
 
-        results = mangadex_api.search(query)
-        return toonkor_api.multi_update_mangadex_search(results)
+        return background_loop.run(search_manhwas(query))
     except Exception as e:
         print(f"Error browsing Manhwa: {e}")
         return []
@@ -280,11 +405,22 @@ def chapter(request, toonkor_id: str, choice: str):
     current_chapter = chapter_from_index(manhwa_dict, chapter_db.index)
     next_chapter = chapter_from_index(manhwa_dict, chapter_db.index + 1)
 
-    pages = []
+    manifest, media_path = [], ""
     if choice == 'downloaded':
-        pages = chapter_db.media_download_pages
+        manifest, media_path = chapter_db.download_manifest, chapter_db.media_downloaded_path
+        if not manifest:
+            # Chapters downloaded before manifests existed get theirs on first read
+            manifest = Chapter.build_manifest(chapter_db.downloaded_path, deduplicate=True)
+            if manifest:
+                status_writer.update(chapter_db.manhwa_id, chapter_db.index, download_manifest=manifest)
     elif choice == 'translated':
-        pages = chapter_db.media_translation_pages
+        manifest, media_path = chapter_db.translation_manifest, chapter_db.media_translated_path
+        if not manifest:
+            manifest = Chapter.build_manifest(chapter_db.translated_path)
+            if manifest:
+                status_writer.update(chapter_db.manhwa_id, chapter_db.index, translation_manifest=manifest)
+
+    page_details = [{**page, 'url': Chapter.media_page(media_path, page)} for page in manifest]
 
     return {
         'manhwa_id': manhwa_dict['toonkor_id'],
@@ -294,7 +430,8 @@ def chapter(request, toonkor_id: str, choice: str):
         'current_chapter': current_chapter,
         'next_chapter': next_chapter,
 
-        'pages': pages
+        'pages': [page['url'] for page in page_details],
+        'page_details': page_details,
     }
 
 
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+
+
+class BlobStore:
+    """
+    Content-addressed store that deduplicates identical page files.
+
+    A stored page is hard linked to blobs/<digest[:2]>/<digest><ext>, so every
+    chapter holding the same image (credits, ads, re-uploads) shares one copy
+    on disk while keeping its usual path for the reader and the translator.
+    The link count of a blob is its reference count: once the blob is its only
+    link left, no chapter uses it and release() deletes it.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self._lock = threading.Lock()
+
+    def path(self, blob: str) -> str:
+        return os.path.join(self.directory, blob[:2], blob)
+
+    def digest(self, path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as file:
+            while chunk := file.read(self.chunk_size):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def store(self, path: str) -> str | None:
+        """Link the file at path to its blob and return the blob name, or None if hard links are unsupported."""
+        blob = f"{self.digest(path)}{os.path.splitext(path)[1].lower()}"
+        blob_path = self.path(blob)
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                if not os.path.exists(blob_path):
+                    os.link(path, blob_path)
+                elif not os.path.samefile(path, blob_path):
+                    # Swap the copy for a link to the blob without a moment where the page is missing
+                    temp_path = f"{path}.link"
+                    try:
+                        os.link(blob_path, temp_path)
+                        os.replace(temp_path, path)
+                    except OSError:
+                        # Don't leave the temporary link behind next to the page
+                        if os.path.lexists(temp_path):
+                            os.remove(temp_path)
+                        raise
+            except OSError as e:
+                print(f"Error storing {path} as a blob: {e}")
+                return None
+        return blob
+
+    def release(self, blobs):
+        """Delete the blobs no page links to anymore."""
+        with self._lock:
+            for blob in set(blobs):
+                blob_path = self.path(blob)
+                try:
+                    if os.stat(blob_path).st_nlink <= 1:
+                        os.remove(blob_path)
+                except FileNotFoundError:
+                    pass
+
+
+blob_store = BlobStore(settings.BLOB_STORE_DIR)
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe dict-like cache bounded by entry count and age.
+
+    Least recently used entries are evicted once max_entries is exceeded, and
+    entries older than their TTL are dropped on access. Compound updates of a
+    cached value should hold `lock`.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl: float | None = None):
+        with self.lock:
+            self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+
+from copy import deepcopy
+from channels.exceptions import ChannelFull
+from channels.layers import InMemoryChannelLayer
+
+
+class LocalChannelLayer(InMemoryChannelLayer):
+    """
+    In-process channel layer that can be shared by several threads and event loops.
+
+    The downloader, cleaner and translation threads send from their own loops
+    while the consumers receive on Daphne's, so messages are handed to the
+    receiving loop with call_soon_threadsafe and the channel and group tables
+    are guarded by a lock. Events never leave the process: this is the default
+    for a single server and for tests, set CHANNEL_LAYER_URL to use Redis instead.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.RLock()
+        self._loops = dict()
+        # Per channel: receive() calls waiting, messages scheduled on the receiving loop, last activity
+        self._receivers = dict()
+        self._in_flight = dict()
+        self._last_used = dict()
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+
+        item = (time.time() + self.expiry, deepcopy(message))
+        with self._lock:
+            queue = self.channels.setdefault(channel, asyncio.Queue())
+            if queue.qsize() + self._in_flight.get(channel, 0) >= self.capacity:
+                raise ChannelFull(channel)
+            self._last_used[channel] = time.time()
+
+            loop = self._loops.get(channel)
+            if loop is None or loop is asyncio.get_running_loop():
+                queue.put_nowait(item)
+            else:
+                # Wake the receiver on its own loop, the channel is kept until the message is queued
+                self._in_flight[channel] = self._in_flight.get(channel, 0) + 1
+                loop.call_soon_threadsafe(self._deliver, channel, queue, item)
+
+    def _deliver(self, channel, queue, item):
+        with self._lock:
+            queue.put_nowait(item)
+            self._in_flight[channel] -= 1
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        with self._lock:
+            self._clean_expired()
+            queue = self.channels.setdefault(channel, asyncio.Queue())
+            self._loops[channel] = asyncio.get_running_loop()
+            self._receivers[channel] = self._receivers.get(channel, 0) + 1
+
+        try:
+            _, message = await queue.get()
+        finally:
+            with self._lock:
+                if channel in self._receivers:
+                    self._receivers[channel] -= 1
+                self._last_used[channel] = time.time()
+        return message
+
+    def _idle(self, channel) -> bool:
+        """Whether dropping the channel loses nothing: no message queued or on its way and nobody waiting."""
+        queue = self.channels.get(channel)
+        return (
+            (queue is None or queue.empty())
+            and not self._receivers.get(channel)
+            and not self._in_flight.get(channel)
+        )
+
+    def _in_group(self, channel) -> bool:
+        return any(channel in channels for channels in self.groups.values())
+
+    def _forget(self, channel):
+        for table in (self.channels, self._loops, self._receivers, self._in_flight, self._last_used):
+            table.pop(channel, None)
+
+    def _clean_expired(self):
+        """
+        Drop expired messages and group memberships like InMemoryChannelLayer, and the channels left
+        idle outside of any group for longer than expiry. An empty queue alone does not end a channel.
+        """
+        now = time.time()
+        for channel, queue in list(self.channels.items()):
+            while not queue.empty() and queue._queue[0][0] < now:
+                queue.get_nowait()
+                self._remove_from_groups(channel)
+            if (
+                self._idle(channel) and not self._in_group(channel)
+                and self._last_used.get(channel, 0) + self.expiry < now
+            ):
+                self._forget(channel)
+
+        timeout = int(now) - self.group_expiry
+        for group in self.groups:
+            for channel in list(self.groups.get(group, set())):
+                if self.groups[group][channel] and int(self.groups[group][channel]) < timeout:
+                    del self.groups[group][channel]
+
+    async def flush(self):
+        with self._lock:
+            self.channels = dict()
+            self.groups = dict()
+            self._loops = dict()
+            self._receivers = dict()
+            self._in_flight = dict()
+            self._last_used = dict()
+
+    async def group_add(self, group, channel):
+        with self._lock:
+            await super().group_add(group, channel)
+
+    async def group_discard(self, group, channel):
+        with self._lock:
+            await super().group_discard(group, channel)
+            # A consumer leaves its groups when it disconnects
+            if not self._in_group(channel) and self._idle(channel):
+                self._forget(channel)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        with self._lock:
+            self._clean_expired()
+            channels = list(self.groups.get(group, {}))
+
+        for channel in channels:
+            try:
+                await self.send(channel, message)
+            except ChannelFull:
+                pass
@@ -0,0 +1,135 @@
+import os
+import struct
+import threading
+import zipfile
+
+from django.conf import settings
+from PIL import Image
+from toonkor_collector2.cache import TTLCache
+
+
+# Chapter folders are not touched by the compactor and the cleaner at the same time
+archive_lock = threading.RLock()
+member_indexes = TTLCache(settings.ARCHIVE_INDEX_CACHE_SIZE, settings.ARCHIVE_INDEX_CACHE_TTL)
+
+
+def archive_path(chapter_path: str) -> str:
+    """The archive a chapter folder is packed into."""
+    return f"{chapter_path}.cbz"
+
+
+def split_page_path(page_path: str) -> tuple[str, str]:
+    """Split the path of a page into its chapter folder and its name inside the chapter archive."""
+    folder, name = os.path.split(page_path)
+    if os.path.basename(folder) == "translated":
+        return os.path.dirname(folder), f"translated/{name}"
+    return folder, name
+
+
+def member_offsets(path: str) -> dict[str, tuple[int, int]]:
+    """
+    Map each stored member of the archive at path to the (offset, size) of its bytes.
+
+    Members are written uncompressed, so a page can be served straight from the
+    archive with a seek. The index is cached until the archive changes.
+    """
+    key = (path, os.stat(path).st_mtime_ns)
+    offsets = member_indexes.get(key)
+    if offsets is not None:
+        return offsets
+
+    offsets = dict()
+    with open(path, "rb") as file, zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                continue
+            # The local header repeats the name and may carry a different extra field than the central directory
+            file.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", file.read(4))
+            offsets[info.filename] = (info.header_offset + 30 + name_length + extra_length, info.file_size)
+    member_indexes.set(key, offsets)
+    return offsets
+
+
+def locate_page(page_path: str) -> tuple[str, int, int] | None:
+    """Return (archive, offset, size) of a page that was packed, or None."""
+    chapter_path, name = split_page_path(page_path)
+    path = archive_path(chapter_path)
+    if not os.path.isfile(path):
+        return None
+    member = member_offsets(path).get(name)
+    if member is None:
+        return None
+    return path, *member
+
+
+def archive_manifest(pages_path: str, is_page) -> list[dict]:
+    """Build the manifest of the pages of pages_path from the chapter archive."""
+    chapter_path, prefix = split_page_path(os.path.join(pages_path, ""))
+    path = archive_path(chapter_path)
+    if not os.path.isfile(path):
+        return []
+
+    manifest = []
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            folder, name = os.path.split(info.filename)
+            member_prefix = f"{folder}/" if folder else ""
+            if member_prefix != prefix or not is_page(name):
+                continue
+            try:
+                with archive.open(info) as member, Image.open(member) as image:
+                    width, height = image.size
+            except Exception:
+                width, height = None, None
+            manifest.append({"name": name, "width": width, "height": height, "size": info.file_size})
+    manifest.sort(key=lambda page: int(os.path.splitext(page["name"])[0]))
+    return manifest
+
+
+def pack_chapter(chapter_path: str, is_page) -> bool:
+    """
+    Pack the pages of a chapter folder, translated ones included, into its archive.
+
+    The archive is complete before any loose page is deleted, so the pages can
+    be read at any time. Returns False if there was nothing to pack or a page
+    would not fit in the archive.
+    """
+    from modules.utils.archives import is_image_file, make_cbz
+
+    with archive_lock:
+        if not os.path.isdir(chapter_path) or os.path.exists(archive_path(chapter_path)):
+            return False
+
+        pages = []
+        for dirpath, dirnames, filenames in os.walk(chapter_path):
+            pages += [os.path.join(dirpath, file) for file in filenames if is_page(file)]
+        # make_cbz leaves out what it does not consider an image, those chapters stay loose
+        if not pages or not all(is_image_file(page) for page in pages):
+            return False
+
+        temp_path = f"{archive_path(chapter_path)}.part"
+        make_cbz(chapter_path, output_path=temp_path)
+        os.replace(temp_path, archive_path(chapter_path))
+
+        for page in pages:
+            os.remove(page)
+        for dirpath, dirnames, filenames in os.walk(chapter_path, topdown=False):
+            if not os.listdir(dirpath):
+                os.rmdir(dirpath)
+        return True
+
+
+def unpack_chapter(chapter_path: str, downloaded: bool = True, translated: bool = True):
+    """Extract the downloaded and/or translated pages of a packed chapter back into its folder and drop the archive."""
+    with archive_lock:
+        path = archive_path(chapter_path)
+        if not os.path.isfile(path):
+            return
+
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                is_translated = name.startswith("translated/")
+                if (translated if is_translated else downloaded):
+                    archive.extract(name, chapter_path)
+        os.remove(path)
@@ -1,69 +1,122 @@
 import asyncio
-import threading
+import os
 
 from asgiref.sync import sync_to_async
 from toonkor_collector2.api import update_cached_chapter
-from collections import deque
-from channels.layers import get_channel_layer
-from toonkor_collector2.models import Chapter
+from toonkor_collector2.blob_store import blob_store
+from toonkor_collector2.chapter_archives import archive_lock, unpack_chapter
+from toonkor_collector2.jobs import JobWorker, batch_progress, complete_jobs, enqueue_jobs, fail_job, lease_batch
+from toonkor_collector2.models import Chapter, Job, StatusChoices
+from toonkor_collector2.progress import progress_aggregator
+from toonkor_collector2.status_writer import status_writer
 
 
-class Cleaner:
-    def __init__(self):
-        self._queue = deque()
-        self._thread = None
-        self._channel_layer = get_channel_layer()
+def select_chapters(manhwa_id: str, ranges: list[list[int]] | None = None) -> list[dict]:
+    """
+    Chapters of a manhwa in the database as dicts the frontend understands.
+
+    ranges is a list of inclusive [start, end] index pairs; None selects every chapter.
+    """
+    chapters = Chapter.objects.filter(manhwa_id=manhwa_id)
+    if ranges is not None:
+        chapters = chapters.filter(index__in=[
+            index for start, end in ranges for index in range(int(start), int(end) + 1)
+        ])
+    return list(
+        chapters.order_by("index").values("index", "toonkor_id", "date_upload", "download_status", "translation_status")
+    )
+
+
+def delete_chapters_pages(manhwa_path: str, indexes: set[int], downloaded: bool, translated: bool):
+    """Delete the pages of the chapters in indexes with a single walk of the manhwa folder."""
+    if not os.path.isdir(manhwa_path):
+        return
+
+    with archive_lock:
+        # Packed chapters get back the pages that are kept, the walk then removes the rest
+        for index in indexes:
+            unpack_chapter(f"{manhwa_path}/{index}", downloaded=not downloaded, translated=not translated)
+        delete_loose_pages(manhwa_path, indexes, downloaded, translated)
+
+
+def delete_loose_pages(manhwa_path: str, indexes: set[int], downloaded: bool, translated: bool):
+    # Bottom-up, so a translated folder is gone before its chapter folder is checked
+    for dirpath, dirnames, filenames in os.walk(manhwa_path, topdown=False):
+        parts = os.path.relpath(dirpath, manhwa_path).split(os.sep)
+        if not parts[0].isdigit() or int(parts[0]) not in indexes:
+            continue
+        if parts[1:] == ["translated"]:
+            remove = translated
+        elif len(parts) == 1:
+            remove = downloaded
+        else:
+            continue
+
+        if remove:
+            for file in filenames:
+                if Chapter.is_page(file):
+                    os.remove(os.path.join(dirpath, file))
+        if not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+class Cleaner(JobWorker):
+    tasks = ('remove',)
 
     def append(self, manhwa_id, group_name, chapters, remove_choices):
-        """Add a new download task to the queue and start the worker thread if necessary."""
-        self._queue.append([manhwa_id, group_name, chapters, remove_choices])
-
-        if self._thread is None or not self._thread.is_alive():
-            self._thread = threading.Thread(target=self._run_loop)
-            self._thread.daemon = True
-            self._thread.start()
-
-    def _run_loop(self):
-        """Worker loop that processes tasks from the queue."""
-        while self._queue:
-            manhwa_id, group_name, chapters, remove_choices = self._queue.popleft()
-            try:
-                for chapter in chapters:
-                    asyncio.run(self._remove(manhwa_id, group_name, chapter, remove_choices))
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-
-    async def _remove(self, manhwa_id, group_name, chapter, remove_choices):
-        chapter_obj = await sync_to_async(Chapter.objects.get)(
-            manhwa_id=manhwa_id,
-            index=chapter['index'],
-            toonkor_id=chapter['toonkor_id'],
-            date_upload=chapter['date_upload']
+        """Store a remove job per chapter and start the worker thread if necessary."""
+        enqueue_jobs('remove', manhwa_id, group_name, chapters, remove_choices)
+        self.start()
+
+    def process(self, job: Job):
+        # The rest of the batch is removed along with the leased job
+        jobs = [job] + lease_batch(job)
+        self.hold(jobs[1:])
+        try:
+            asyncio.run(self._remove(jobs))
+        except Exception as e:
+            for other in jobs[1:]:
+                fail_job(other, str(e))
+            raise
+
+    async def _remove(self, jobs: list[Job]):
+        manhwa_id, group_name, remove_choices = jobs[0].manhwa_id, jobs[0].group_name, jobs[0].remove_choices
+        chapters = [job.chapter for job in jobs]
+        manhwa_path = Chapter(manhwa_id=manhwa_id).manhwa_path
+        indexes = {int(chapter['index']) for chapter in chapters}
+        manifests = await sync_to_async(list)(
+            Chapter.objects.filter(manhwa_id=manhwa_id, index__in=indexes).values_list("download_manifest", flat=True)
+        )
+        await sync_to_async(delete_chapters_pages)(
+            manhwa_path, indexes, remove_choices["downloaded"], remove_choices["translated"]
         )
         if remove_choices["downloaded"]:
-            chapter_obj.delete_download(save=False)
-            chapter['download_status'] = "NOT_READY"
-            update_cached_chapter(manhwa_id, chapter['index'], "download_status", "NOT_READY")
+            # Blobs still linked from other chapters are kept
+            await sync_to_async(blob_store.release)(
+                [blob for manifest in manifests for blob in Chapter.manifest_blobs(manifest)]
+            )
 
+        statuses = dict()
+        if remove_choices["downloaded"]:
+            statuses['download_status'] = StatusChoices.NOT_READY
+            statuses['download_manifest'] = []
         if remove_choices["translated"]:
-            chapter_obj.delete_translation(save=False)
-            chapter['translation_status'] = "NOT_READY"
-            update_cached_chapter(manhwa_id, chapter['index'], "translation_status", "NOT_READY")
-            
-        await sync_to_async(chapter_obj.save)()
-        await self._send_progress(group_name, [chapter], {})
-
-    async def _send_progress(self, group_name, chapters, progress):
-        """Send progress updates to the WebSocket group."""
-        await self._channel_layer.group_send(
-            group_name,
-            {
-                "type": "send_progress",
-                "chapters": chapters,
-                "progress": progress,
-            }
-        )
+            statuses['translation_status'] = StatusChoices.NOT_READY
+            statuses['translation_manifest'] = []
+
+        for chapter in chapters:
+            # Flushed together as one bulk_update
+            status_writer.update(manhwa_id, chapter['index'], **statuses)
+            if remove_choices["downloaded"]:
+                chapter['download_status'] = "NOT_READY"
+                update_cached_chapter(manhwa_id, chapter['index'], "download_status", "NOT_READY")
+            if remove_choices["translated"]:
+                chapter['translation_status'] = "NOT_READY"
+                update_cached_chapter(manhwa_id, chapter['index'], "translation_status", "NOT_READY")
+
+        await sync_to_async(complete_jobs)(jobs)
+        progress = await sync_to_async(batch_progress)(jobs[0].batch)
+        progress_aggregator.push(group_name, chapters, progress)
 
 
-cleaner = Cleaner()
\ No newline at end of file
+cleaner = Cleaner()
@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from toonkor_collector2.blob_store import blob_store
+from toonkor_collector2.chapter_archives import pack_chapter
+from toonkor_collector2.models import Chapter, Job, JobStateChoices, StatusChoices
+from toonkor_collector2.status_writer import status_writer
+
+
+class Compactor:
+    """
+    Packs chapters that are done changing into CBZ archives for cold storage.
+
+    Every CHAPTER_ARCHIVE_INTERVAL seconds, downloaded chapters that are not
+    being downloaded, translated or removed and were last written more than
+    CHAPTER_ARCHIVE_AGE days ago get their loose pages packed. Reads go
+    through the archive transparently (see chapter_archives.locate_page).
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CHAPTER_ARCHIVE_AGE is not None
+
+    def start(self):
+        with self._lock:
+            if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run_loop(self):
+        while True:
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Error packing chapters: {e}")
+            time.sleep(settings.CHAPTER_ARCHIVE_INTERVAL)
+
+    def compact(self) -> int:
+        """Pack every chapter old enough. Returns how many were packed."""
+        # Statuses still buffered in the status writer must be seen before picking chapters
+        status_writer.flush()
+        busy = set(
+            Job.objects.filter(state__in=[JobStateChoices.QUEUED, JobStateChoices.RUNNING])
+            .values_list("manhwa_id", "chapter_index")
+        )
+        in_progress = [StatusChoices.LOADING, StatusChoices.REMOVING]
+        chapters = (
+            Chapter.objects.filter(download_status=StatusChoices.READY)
+            .exclude(Q(translation_status__in=in_progress))
+        )
+        cutoff = time.time() - timedelta(days=settings.CHAPTER_ARCHIVE_AGE).total_seconds()
+
+        released = []
+        for chapter in chapters.iterator():
+            if (chapter.manhwa_id, chapter.index) in busy or not os.path.isdir(chapter.downloaded_path):
+                continue
+            if os.stat(chapter.downloaded_path).st_mtime > cutoff:
+                continue
+            if pack_chapter(chapter.downloaded_path, Chapter.is_page):
+                # The archive holds its own copy now, so pages are no longer served from their blobs
+                manifest = [{key: value for key, value in page.items() if key != "blob"} for page in chapter.download_manifest]
+                status_writer.update(chapter.manhwa_id, chapter.index, download_manifest=manifest)
+                released.append(chapter.download_manifest)
+
+        # The blobs are released only once no stored manifest points at them
+        status_writer.flush()
+        for manifest in released:
+            blob_store.release(Chapter.manifest_blobs(manifest))
+        return len(released)
+
+
+compactor = Compactor()
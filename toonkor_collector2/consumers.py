@@ -3,10 +3,13 @@ import json
 
 from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from toonkor_collector2.cleaner import cleaner
+from toonkor_collector2.cleaner import cleaner, select_chapters
 from toonkor_collector2.downloader import downloader
-from toonkor_collector2.models import Chapter, StatusChoices, encode_name
+from toonkor_collector2.library import library_refresher
+from toonkor_collector2.models import encode_name
+from toonkor_collector2.progress import progress_aggregator
 from toonkor_collector2.api import update_cached_chapter
+from toonkor_collector2.translator import translator
 
 
 class QtConsumer(AsyncWebsocketConsumer):
@@ -40,8 +43,8 @@ class QtConsumer(AsyncWebsocketConsumer):
 
     async def receive(self, text_data):
         """
-        Receives data from the WebSocket client, processes the translation request,
-        updates the chapter status in the database, and triggers the download/translate process.
+        Receives data from the WebSocket client when a chapter is translated and hands
+        it to the translate job waiting for it, which updates the chapter status.
 
         Args:
             text_data (str): JSON string containing the manhwa toonkor_id and chapter index.
@@ -49,21 +52,8 @@ class QtConsumer(AsyncWebsocketConsumer):
         data = json.loads(text_data)
         toonkor_id = data["toonkor_id"]
         chapter = int(data["chapter"])
-        chapter_obj = await sync_to_async(Chapter.objects.get)(
-            manhwa_id=toonkor_id, index=chapter
-        )
-        chapter_obj.translation_status = StatusChoices.READY
-        await sync_to_async(chapter_obj.save)()
-        update_cached_chapter(toonkor_id, chapter, 'translation_status', 'READY')
-        group = f"download_translate_{encode_name(toonkor_id)}" 
-        await self.channel_layer.group_send(
-            group,
-            {
-                "type": "send_progress",
-                "chapters": [{"index": chapter, "status": "Translated"}],
-                "progress": data["progress"],
-            },
-        )
+        if not translator.gui_finished(toonkor_id, chapter):
+            print(f"No translate job is waiting for chapter {chapter + 1} of {toonkor_id}")
 
     async def disconnect(self, close_code):
         """
@@ -104,12 +94,16 @@ class DownloadTranslateConsumer(AsyncWebsocketConsumer):
 
         Args:
             text_data (str): JSON string containing the task, manhwa toonkor_id, and chapters to download.
+                A remove task may give "ranges" of inclusive [start, end] indexes, or neither
+                chapters nor ranges to remove the whole manhwa.
         """
         data = json.loads(text_data)
         task = data["task"]
-        chapters = data["chapters"]
+        chapters = data.get("chapters")
         if task == "remove":
             remove_choices  = data["remove_choices"]        
+            if chapters is None:
+                chapters = await sync_to_async(select_chapters)(self.manhwa_id, data.get("ranges"))
             await self.run_remove(chapters, remove_choices)
         else:
             await self.run_download_translate(task, chapters)
@@ -123,15 +117,8 @@ class DownloadTranslateConsumer(AsyncWebsocketConsumer):
                 chapter['translation_status'] = 'LOADING'
                 update_cached_chapter(self.manhwa_id, chapter['index'], 'translation_status', 'LOADING')
 
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                "type": "send_progress",
-                "chapters": chapters,
-                "progress": progress,
-            }
-        )
-        downloader.append(self.manhwa_id, self.group_name, task, chapters)
+        progress_aggregator.push(self.group_name, chapters, progress)
+        await sync_to_async(downloader.append)(self.manhwa_id, self.group_name, task, chapters)
 
     async def run_remove(self, chapters, remove_choices):
         for chapter in chapters:
@@ -141,17 +128,10 @@ class DownloadTranslateConsumer(AsyncWebsocketConsumer):
 
             if remove_choices['translated']:
                 chapter['translation_status'] = 'REMOVING'        
-                update_cached_chapter(self.manhwa_id, chapter['index'], 'remove_status', 'REMOVING')
-
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                "type": "send_progress",
-                "chapters": chapters,
-                "progress": {},
-            }
-        )
-        cleaner.append(self.manhwa_id, self.group_name, chapters, remove_choices)
+                update_cached_chapter(self.manhwa_id, chapter['index'], 'translation_status', 'REMOVING')
+
+        progress_aggregator.push(self.group_name, chapters)
+        await sync_to_async(cleaner.append)(self.manhwa_id, self.group_name, chapters, remove_choices)
 
     async def send_progress(self, event):
         """
@@ -170,3 +150,50 @@ class DownloadTranslateConsumer(AsyncWebsocketConsumer):
             close_code (int): The WebSocket close code.
         """
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+
+class LibraryConsumer(AsyncWebsocketConsumer):
+    """
+    LibraryConsumer is an AsyncWebsocketConsumer that starts library refreshes
+    and reports their progress and summary back to the client.
+    """
+
+    async def connect(self):
+        """
+        Handles a new WebSocket connection. Adds the connection to the 'library' group
+        and accepts the WebSocket connection.
+        """
+        self.group_name = library_refresher.group_name
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def receive(self, text_data):
+        """
+        Receives data from the WebSocket client and starts a refresh of the whole library.
+
+        Args:
+            text_data (str): JSON string containing the task, "refresh".
+        """
+        data = json.loads(text_data)
+        if data["task"] == "refresh":
+            started = library_refresher.start()
+            if not started:
+                await self.send(text_data=json.dumps({"error": "A library refresh is already running"}))
+
+    async def send_progress(self, event):
+        """
+        Sends refresh progress, and the final summary, to the WebSocket client.
+
+        Args:
+            event (dict): The event data containing progress information.
+        """
+        await self.send(text_data=json.dumps(event))
+
+    async def disconnect(self, close_code):
+        """
+        Handles the disconnection of the WebSocket client by removing it from the 'library' group.
+
+        Args:
+            close_code (int): The WebSocket close code.
+        """
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from PIL import Image
+
+
+class DerivativeStore:
+    """
+    Resized WebP/AVIF copies of the images under MEDIA_ROOT.
+
+    A variant is generated the first time it is asked for and kept on disk under
+    a name derived from the source path, its mtime and the width, so replacing
+    the source (a new download, a new translation) makes the next request
+    generate a fresh one while the stale files are deleted.
+    """
+    content_types = {"avif": "image/avif", "webp": "image/webp"}
+    max_heights = {"webp": 16383}
+
+    def __init__(self, directory, widths):
+        self.directory = str(directory)
+        self.widths = tuple(sorted(widths))
+        self._locks = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def formats(self) -> tuple[str, ...]:
+        """Formats Pillow can write here, best first."""
+        extensions = Image.registered_extensions()
+        return tuple(format for format in ("avif", "webp") if f".{format}" in extensions)
+
+    def choose_format(self, accept: str) -> str | None:
+        """Pick the best format the client accepts, or None to serve the original."""
+        for format in self.formats:
+            if self.content_types[format] in accept:
+                return format
+        return None
+
+    def snap_width(self, width: int) -> int:
+        """Round width up to a configured width, so there are only a few variants per image."""
+        for allowed in self.widths:
+            if width <= allowed:
+                return allowed
+        return self.widths[-1]
+
+    def get(self, source: str, width: int, format: str) -> str:
+        """Return the path of the variant of source, generating it if needed."""
+        width = self.snap_width(width)
+        mtime = os.stat(source).st_mtime_ns
+        key = hashlib.sha1(os.path.abspath(source).encode()).hexdigest()
+        folder = os.path.join(self.directory, key[:2])
+        prefix = f"{key}-{width}-"
+        path = os.path.join(folder, f"{prefix}{mtime}.{format}")
+        if os.path.isfile(path):
+            return path
+
+        try:
+            # Concurrent requests for the same variant wait for one generation
+            with self._key_lock(path):
+                if os.path.isfile(path):
+                    return path
+                os.makedirs(folder, exist_ok=True)
+                for file in os.listdir(folder):
+                    if file.startswith(prefix) and file.endswith(f".{format}"):
+                        os.remove(os.path.join(folder, file))
+                self._generate(source, path, width, format)
+        finally:
+            with self._lock:
+                self._locks.pop(path, None)
+        return path
+
+    def _key_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def _generate(self, source: str, path: str, width: int, format: str):
+        with Image.open(source) as image:
+            image.draft("RGB", (width, image.height * width // max(image.width, 1)))
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            if image.width > width:
+                image = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+            if image.height > self.max_heights.get(format, image.height):
+                raise ValueError(f"{source} is too tall for {format}")
+
+            temp_path = f"{path}.part"
+            image.save(temp_path, format=format.upper(), quality=settings.DERIVATIVE_QUALITY)
+        os.replace(temp_path, path)
+
+
+derivatives = DerivativeStore(settings.DERIVATIVE_DIR, settings.DERIVATIVE_WIDTHS)
@@ -1,91 +1,107 @@
 import asyncio
-import threading
+import os
 
-from collections import deque
-from channels.layers import get_channel_layer
 from asgiref.sync import sync_to_async
-from toonkor_collector2.api import update_cached_chapter, start_comic_proc
-from toonkor_collector2.models import Chapter, StatusChoices
-from toonkor_collector2.toonkor_api import toonkor_api
-
-
-class Downloader:
-    def __init__(self):
-        self._queue = deque()
-        self._thread = None
-        self._channel_layer = get_channel_layer()
-        self._comic_proc = None
+from django.conf import settings
+from django.db import transaction
+from toonkor_collector2.api import update_cached_chapter
+from toonkor_collector2.chapter_archives import unpack_chapter
+from toonkor_collector2.jobs import (
+    JobWorker, batch_progress, complete_job, enqueue_jobs, enqueue_translation, restore_chapter_status
+)
+from toonkor_collector2.models import Chapter, Job, StatusChoices
+from toonkor_collector2.progress import progress_aggregator
+from toonkor_collector2.status_writer import status_writer
+from toonkor_collector2.event_loop import background_loop
+from toonkor_collector2.toonkor_api import async_toonkor_api
+from toonkor_collector2.translator import translator
+
+
+class Downloader(JobWorker):
+    tasks = ('download', 'download_translate')
+    concurrency = settings.DOWNLOAD_CHAPTERS_IN_FLIGHT
 
     def append(self, manhwa_id, group_name, task, chapters):
-        """Add a new download task to the queue and start the worker thread if necessary."""
-        self._queue.append([manhwa_id, group_name, task, chapters])
-
-        if self._thread is None or not self._thread.is_alive():
-            self._thread = threading.Thread(target=self._run_loop)
-            self._thread.daemon = True
-            self._thread.start()
-
-    def _run_loop(self):
-        """Worker loop that processes tasks from the queue."""
-        while self._queue:
-            try:
-                # Get the next task from the queue
-                manhwa_id, group_name, task, chapters = self._queue.popleft()
-                asyncio.run(self._download_chapters(manhwa_id, group_name, task, chapters))
-
-            except Exception as e:
-                print(f"Error processing task: {e}")
-
-    async def _download_chapters(self, manhwa_id, group_name, task, chapters):
-        """Download chapters and update progress in real-time."""
-        progress = {"current": 0, "total": len(chapters)}
-
-        try:
-            for chapter in chapters:
-                chapter_index: int = chapter['index']
-                download_dict: dict = {manhwa_id: {chapter_index: {}}}
-                page_paths: list[str] = toonkor_api.download_chapter(manhwa_id, chapter)
-
-                if page_paths:
-                    progress["current"] += 1
-
-                    chapter_obj, _ = await sync_to_async(Chapter.objects.get_or_create)(
-                        manhwa_id=manhwa_id,
-                        index=chapter['index'],
-                        toonkor_id=chapter['toonkor_id'],
-                        date_upload=chapter['date_upload']
-                    )
-                    chapter_obj.download_status = StatusChoices.READY
-                    await sync_to_async(chapter_obj.save)()
-
-                    chapter['download_status'] = 'READY'
-                    update_cached_chapter(manhwa_id, chapter['index'], "download_status", 'READY')
-
-                    # Send progress update
-                    await self._send_progress(group_name, [chapter], progress)
-                    download_dict[manhwa_id][chapter_index] = {"page_paths": page_paths}
-                    if task == 'download_translate':
-                        start_comic_proc()
-                        await self._send_translation_request(download_dict)
-
-                else:
-                    await self._send_error(group_name, f"Failed to download chapter {chapter['index'] + 1} of {manhwa_id}")
-
-        except Exception as e:
-            await self._send_error(group_name, str(e))
-            raise e
-
-    async def _send_progress(self, group_name, chapters, progress):
-        """Send progress updates to the WebSocket group."""
-        await self._channel_layer.group_send(
-            group_name,
-            {
-                "type": "send_progress",
-                "chapters": chapters,
-                "progress": progress,
-            }
+        """Store a download job per chapter and start the worker thread if necessary."""
+        enqueue_jobs(task, manhwa_id, group_name, chapters)
+        self.start()
+
+    def process(self, job: Job):
+        asyncio.run(self._download_chapter(job))
+
+    def on_failed(self, job: Job, error: str):
+        download_status, translation_status = StatusChoices.NOT_READY, StatusChoices.NOT_READY
+        chapter_obj = Chapter.objects.filter(manhwa_id=job.manhwa_id, index=job.chapter_index).first()
+        if chapter_obj is not None:
+            restore_chapter_status(chapter_obj)
+            download_status, translation_status = chapter_obj.download_status, chapter_obj.translation_status
+            status_writer.update(
+                job.manhwa_id,
+                job.chapter_index,
+                download_status=download_status,
+                translation_status=translation_status,
+                download_manifest=chapter_obj.download_manifest,
+                translation_manifest=chapter_obj.translation_manifest,
+            )
+        update_cached_chapter(job.manhwa_id, job.chapter_index, "download_status", str(download_status))
+        update_cached_chapter(job.manhwa_id, job.chapter_index, "translation_status", str(translation_status))
+        progress_aggregator.push(
+            job.group_name,
+            [{"index": job.chapter_index, "download_status": download_status, "translation_status": translation_status}],
+            batch_progress(job.batch, job.task),
+        )
+        asyncio.run(self._send_error(job.group_name, error))
+
+    async def _download_chapter(self, job: Job):
+        """Download a chapter and update progress in real-time."""
+        manhwa_id, group_name, task, chapter = job.manhwa_id, job.group_name, job.task, job.chapter
+        chapter_index: int = chapter['index']
+        # A packed chapter is unpacked, its pages are then skipped instead of downloaded again
+        unpack_chapter(Chapter(manhwa_id=manhwa_id, index=chapter_index).downloaded_path)
+        # Pages of every chapter in flight share one httpx client on the background loop
+        page_paths: list[str] = await background_loop.run_async(
+            async_toonkor_api.download_chapter(manhwa_id, chapter)
         )
 
+        if not page_paths:
+            raise Exception(f"Failed to download chapter {chapter['index'] + 1} of {manhwa_id}")
+
+        statuses = {
+            'download_status': StatusChoices.READY,
+            'download_manifest': Chapter.build_manifest(os.path.dirname(page_paths[0]), deduplicate=True),
+        }
+        if task == 'download_translate':
+            statuses['translation_status'] = StatusChoices.LOADING
+        await sync_to_async(Chapter.objects.get_or_create)(
+            manhwa_id=manhwa_id,
+            index=chapter['index'],
+            defaults={'toonkor_id': chapter['toonkor_id'], 'date_upload': chapter['date_upload'], **statuses}
+        )
+        # Always queue it, so a LOADING queued at enqueue time cannot land after this
+        status_writer.update(manhwa_id, chapter['index'], **statuses)
+
+        chapter['download_status'] = 'READY'
+        update_cached_chapter(manhwa_id, chapter['index'], "download_status", 'READY')
+
+        if not await sync_to_async(self._finish)(job, page_paths):
+            # The lease ran out and another worker took the chapter over, it reports the progress
+            return
+        progress = await sync_to_async(batch_progress)(job.batch, job.task)
+
+        progress_aggregator.push(group_name, [chapter], progress)
+        if task == 'download_translate':
+            translator.start()
+
+    @staticmethod
+    def _finish(job: Job, page_paths: list[str]) -> bool:
+        """Complete the job and queue the translation of its chapter in one transaction. Returns False if the lease was lost."""
+        with transaction.atomic():
+            if not complete_job(job):
+                return False
+            if job.task == 'download_translate':
+                enqueue_translation(job, page_paths)
+        return True
+
     async def _send_error(self, group_name, error_message):
         """Send an error message to the WebSocket group."""
         await self._channel_layer.group_send(
@@ -96,15 +112,5 @@ class Downloader:
             }
         )
 
-    async def _send_translation_request(self, download_dict):
-        """Send translation request to the 'qt' group."""
-        await self._channel_layer.group_send(
-            "qt",
-            {
-                "type": "send_translation_request",
-                "to_translate": download_dict,
-            }
-        )
-
 
 downloader = Downloader()
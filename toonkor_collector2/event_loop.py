@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+
+class BackgroundLoop:
+    """
+    An event loop running forever on a daemon thread.
+
+    Threads with their own loop (or none at all) submit coroutines to it, so
+    clients bound to a loop, like httpx.AsyncClient, can be shared by all of them.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._loop.run_forever)
+                thread.daemon = True
+                thread.start()
+            return self._loop
+
+    def submit(self, coro):
+        """Schedule coro on the loop and return a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro):
+        """Run coro on the loop and block until it is done."""
+        return self.submit(coro).result()
+
+    async def run_async(self, coro):
+        """Await coro on the loop from another event loop."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+
+background_loop = BackgroundLoop()
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+
+
+class HostSlots:
+    """
+    Budget of concurrent requests per host, shared by threads and coroutines.
+
+    Threads wait in hold(), coroutines in hold_async() without blocking their
+    loop. Both take from the same slots in arrival order, so the html and
+    thumbnails fetched by ToonkorAPI and the pages fetched by AsyncToonkorAPI
+    never exceed the limit together. A released slot is handed straight to
+    the next waiter.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._used = dict()
+        # Per host: (loop, future) of a waiting coroutine, or (None, event) of a waiting thread
+        self._waiters = dict()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, host: str) -> bool:
+        if self._used.get(host, 0) < self.limit and not self._waiters.get(host):
+            self._used[host] = self._used.get(host, 0) + 1
+            return True
+        return False
+
+    def acquire(self, host: str):
+        with self._lock:
+            if self._try_acquire(host):
+                return
+            event = threading.Event()
+            self._waiters.setdefault(host, deque()).append((None, event))
+        event.wait()
+
+    async def acquire_async(self, host: str):
+        with self._lock:
+            if self._try_acquire(host):
+                return
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.setdefault(host, deque()).append(waiter)
+
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                waiters = self._waiters.get(host)
+                if waiters is not None and waiter in waiters:
+                    waiters.remove(waiter)
+                    raise
+            # The slot was handed over already, a cancelled future gives it back in _hand_over
+            if not waiter[1].cancelled():
+                self.release(host)
+            raise
+
+    def release(self, host: str):
+        with self._lock:
+            waiters = self._waiters.get(host)
+            while waiters:
+                loop, waiter = waiters.popleft()
+                if loop is None:
+                    waiter.set()
+                    return
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, host, waiter)
+                    return
+                except RuntimeError:
+                    # The loop of this waiter is closed
+                    continue
+            self._used[host] -= 1
+            if not self._used[host]:
+                del self._used[host]
+                self._waiters.pop(host, None)
+
+    def _hand_over(self, host: str, future: asyncio.Future):
+        if future.done():
+            self.release(host)
+        else:
+            future.set_result(None)
+
+    @contextmanager
+    def hold(self, url: str):
+        """Hold a slot of the host of url for the duration of the block."""
+        host = urlparse(url).netloc
+        self.acquire(host)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    @asynccontextmanager
+    async def hold_async(self, url: str):
+        """hold() for coroutines."""
+        host = urlparse(url).netloc
+        await self.acquire_async(host)
+        try:
+            yield
+        finally:
+            self.release(host)
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+
+class HttpCache:
+    """
+    On-disk cache of response bodies keyed by URL.
+
+    Entries younger than the TTL of their endpoint type are served as is. Older
+    ones are revalidated with If-None-Match / If-Modified-Since, so an unchanged
+    page costs a 304 instead of a full download and parse.
+
+    Entries not stored or refreshed for max_age seconds are dropped, and the
+    least recently stored ones go first once the cache exceeds max_bytes. The
+    cache is pruned on store, at most once every prune_interval seconds.
+    """
+
+    def __init__(self, directory, ttls: dict[str, int], max_age: float | None = None,
+                 max_bytes: int | None = None, prune_interval: float = 60):
+        self.directory = str(directory)
+        self.ttls = ttls
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+
+    def path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def load(self, url: str) -> dict | None:
+        try:
+            with open(self.path(url), "r", encoding="UTF-8") as file:
+                entry = json.load(file)
+            return entry if entry.get("url") == url else None
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: dict | None, endpoint: str) -> bool:
+        return entry is not None and time.time() - entry["stored_at"] < self.ttls.get(endpoint, 0)
+
+    @staticmethod
+    def conditional_headers(entry: dict | None) -> dict:
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, headers, body: str) -> dict:
+        entry = {
+            "url": url,
+            "etag": headers.get("ETag", ""),
+            "last_modified": headers.get("Last-Modified", ""),
+            "stored_at": time.time(),
+            "body": body,
+        }
+        self._write(url, entry)
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self.prune()
+        return entry
+
+    def refresh(self, url: str, entry: dict) -> dict:
+        """Restart the TTL of an entry the server confirmed with a 304."""
+        entry["stored_at"] = time.time()
+        self._write(url, entry)
+        return entry
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def prune(self) -> int:
+        """Delete the entries past max_age, then the oldest ones until the cache fits max_bytes. Returns the count."""
+        self._last_prune = time.monotonic()
+        if self.max_age is None and self.max_bytes is None:
+            return 0
+
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        expired_before = time.time() - self.max_age if self.max_age is not None else None
+        total = sum(size for mtime, size, path in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            expired = expired_before is not None and mtime < expired_before
+            if not expired and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def _write(self, url: str, entry: dict):
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        with os.fdopen(fd, "w", encoding="UTF-8") as file:
+            json.dump(entry, file)
+        os.replace(temp_path, path)
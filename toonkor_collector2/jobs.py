@@ -0,0 +1,359 @@
+import threading
+import uuid
+
+from datetime import timedelta
+from channels.layers import get_channel_layer
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from toonkor_collector2.models import Chapter, Job, JobStateChoices, StatusChoices
+from toonkor_collector2.status_writer import status_writer
+
+
+LEASE_SECONDS = 600
+MAX_ATTEMPTS = 3
+KEEP_FINISHED = timedelta(days=1)
+
+# A worker owns a job while the lease_expires_at it was given is the one in the table.
+# Renewals, completions and failures read and replace it under this lock.
+lease_lock = threading.Lock()
+
+
+def enqueue_jobs(task: str, manhwa_id: str, group_name: str, chapters: list[dict], remove_choices: dict | None = None, priority: int = 0) -> str:
+    """Store one job per chapter and mark the chapters as in progress. Returns the batch id."""
+    batch = uuid.uuid4().hex
+    Job.objects.bulk_create([
+        Job(
+            task=task,
+            batch=batch,
+            group_name=group_name,
+            manhwa_id=manhwa_id,
+            chapter_index=chapter['index'],
+            chapter=chapter,
+            remove_choices=remove_choices or {},
+            priority=priority,
+        )
+        for chapter in chapters
+    ])
+
+    statuses = dict()
+    if task == 'remove':
+        if remove_choices.get('downloaded'):
+            statuses['download_status'] = StatusChoices.REMOVING
+        if remove_choices.get('translated'):
+            statuses['translation_status'] = StatusChoices.REMOVING
+    else:
+        statuses['download_status'] = StatusChoices.LOADING
+        if task == 'download_translate':
+            statuses['translation_status'] = StatusChoices.LOADING
+    for chapter in chapters:
+        status_writer.update(manhwa_id, chapter['index'], **statuses)
+    return batch
+
+
+def enqueue_translation(job: Job, page_paths: list[str]) -> Job:
+    """Queue the translation of the chapter a download_translate job just downloaded, in the same batch."""
+    return Job.objects.create(
+        task='translate',
+        batch=job.batch,
+        group_name=job.group_name,
+        manhwa_id=job.manhwa_id,
+        chapter_index=job.chapter_index,
+        chapter={**job.chapter, 'page_paths': list(page_paths)},
+        priority=job.priority,
+    )
+
+
+def lease_job(tasks: tuple[str, ...], lease_seconds: int = LEASE_SECONDS) -> Job | None:
+    """
+    Claim the next queued job for one of the given tasks.
+
+    Jobs whose lease expired are claimed again, so a worker that died mid-chapter
+    does not hold its job forever, unless that was their last attempt (see
+    fail_exhausted_jobs). The conditional update makes the claim safe when
+    several workers poll the table at once.
+    """
+    while True:
+        now = timezone.now()
+        job = (
+            Job.objects.filter(task__in=tasks, attempts__lt=MAX_ATTEMPTS)
+            .filter(Q(state=JobStateChoices.QUEUED) | Q(state=JobStateChoices.RUNNING, lease_expires_at__lt=now))
+            .order_by("-priority", "created_at")
+            .first()
+        )
+        if job is None:
+            return None
+
+        leased = Job.objects.filter(pk=job.pk, state=job.state, attempts=job.attempts).update(
+            state=JobStateChoices.RUNNING,
+            attempts=F("attempts") + 1,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+        )
+        if leased:
+            job.refresh_from_db()
+            return job
+
+
+def lease_batch(job: Job, lease_seconds: int = LEASE_SECONDS) -> list[Job]:
+    """Claim the jobs still queued in the batch of a leased job, so they can be processed together."""
+    pks = list(
+        Job.objects.filter(batch=job.batch, task=job.task, state=JobStateChoices.QUEUED, attempts__lt=MAX_ATTEMPTS)
+        .exclude(pk=job.pk)
+        .values_list("pk", flat=True)
+    )
+    if not pks:
+        return []
+
+    lease_expires_at = timezone.now() + timedelta(seconds=lease_seconds)
+    Job.objects.filter(pk__in=pks, state=JobStateChoices.QUEUED).update(
+        state=JobStateChoices.RUNNING,
+        attempts=F("attempts") + 1,
+        lease_expires_at=lease_expires_at,
+    )
+    # Jobs another worker claimed in between carry a different lease
+    return list(Job.objects.filter(pk__in=pks, state=JobStateChoices.RUNNING, lease_expires_at=lease_expires_at))
+
+
+def held(job: Job):
+    """The rows of job as long as the worker still holds its lease."""
+    return Job.objects.filter(pk=job.pk, state=JobStateChoices.RUNNING, lease_expires_at=job.lease_expires_at)
+
+
+def renew_leases(jobs: list[Job], lease_seconds: int = LEASE_SECONDS) -> list[Job]:
+    """Extend the leases still held on jobs. Returns the jobs whose lease was lost to another worker."""
+    lost = []
+    with lease_lock:
+        lease_expires_at = timezone.now() + timedelta(seconds=lease_seconds)
+        for job in jobs:
+            if held(job).update(lease_expires_at=lease_expires_at):
+                job.lease_expires_at = lease_expires_at
+            else:
+                lost.append(job)
+    return lost
+
+
+def complete_job(job: Job) -> bool:
+    """Mark the job done. Returns False if its lease was lost, the new owner then completes it."""
+    with lease_lock:
+        completed = held(job).update(state=JobStateChoices.DONE, lease_expires_at=None, updated_at=timezone.now())
+        if completed:
+            job.state = JobStateChoices.DONE
+            job.lease_expires_at = None
+    return bool(completed)
+
+
+def complete_jobs(jobs: list[Job]) -> int:
+    """Mark the jobs whose lease is still held done. Returns how many were."""
+    with lease_lock:
+        query = Q(pk__in=[])
+        for job in jobs:
+            query |= Q(pk=job.pk, lease_expires_at=job.lease_expires_at)
+        completed = Job.objects.filter(query, state=JobStateChoices.RUNNING).update(
+            state=JobStateChoices.DONE, lease_expires_at=None, updated_at=timezone.now()
+        )
+    return completed
+
+
+def fail_job(job: Job, error: str) -> bool:
+    """
+    Put the job back in the queue, or mark it failed once it ran out of attempts. Returns True if it will be retried.
+
+    A job whose lease was lost is left to its new owner and counts as retried.
+    """
+    retry = job.attempts < MAX_ATTEMPTS
+    state = JobStateChoices.QUEUED if retry else JobStateChoices.FAILED
+    with lease_lock:
+        if not held(job).update(state=state, lease_expires_at=None, error=error, updated_at=timezone.now()):
+            return True
+        job.state = state
+        job.lease_expires_at = None
+        job.error = error
+    return retry
+
+
+def fail_exhausted_jobs(tasks: tuple[str, ...]) -> list[Job]:
+    """Mark failed the jobs whose lease ran out on their last attempt, their worker died running them. Returns them."""
+    now = timezone.now()
+    failed = []
+    stale = Job.objects.filter(
+        task__in=tasks, state=JobStateChoices.RUNNING, lease_expires_at__lt=now, attempts__gte=MAX_ATTEMPTS
+    )
+    for job in stale:
+        error = f"The worker stopped during attempt {job.attempts}"
+        with lease_lock:
+            if held(job).update(state=JobStateChoices.FAILED, lease_expires_at=None, error=error, updated_at=now):
+                job.state = JobStateChoices.FAILED
+                job.lease_expires_at = None
+                job.error = error
+                failed.append(job)
+    return failed
+
+
+class LeaseHeartbeat:
+    """Renews the leases of the jobs a worker is running until stopped, so long chapters are not claimed twice."""
+
+    def __init__(self, jobs: list[Job], lease_seconds: int = LEASE_SECONDS):
+        self.jobs = list(jobs)
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop)
+        self._thread.daemon = True
+
+    def add(self, jobs: list[Job]):
+        with lease_lock:
+            self.jobs += jobs
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run_loop(self):
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                try:
+                    for job in renew_leases(self.jobs, self.lease_seconds):
+                        print(f"Lost the lease of job {job}")
+                except Exception as e:
+                    print(f"Error renewing job leases: {e}")
+        finally:
+            connection.close()
+
+
+def next_lease_expiry(tasks: tuple[str, ...], exclude=()):
+    """Return when the earliest running job of the given tasks can be claimed again, or None."""
+    job = (
+        Job.objects.filter(task__in=tasks, state=JobStateChoices.RUNNING)
+        .exclude(pk__in=list(exclude))
+        .order_by("lease_expires_at")
+        .first()
+    )
+    return job.lease_expires_at if job else None
+
+
+def batch_progress(batch: str, task: str | None = None) -> dict:
+    jobs = Job.objects.filter(batch=batch)
+    if task is not None:
+        # A download_translate batch also holds the translate jobs of the chapters downloaded so far
+        jobs = jobs.filter(task=task)
+    finished = jobs.filter(state__in=[JobStateChoices.DONE, JobStateChoices.FAILED]).count()
+    return {"current": finished, "total": jobs.count()}
+
+
+def restore_chapter_status(chapter: Chapter) -> Chapter:
+    """Set the chapter statuses and manifests from the pages found on disk."""
+    chapter.download_manifest = Chapter.build_manifest(chapter.downloaded_path, deduplicate=True)
+    chapter.translation_manifest = Chapter.build_manifest(chapter.translated_path)
+    chapter.download_status = StatusChoices.READY if chapter.download_manifest else StatusChoices.NOT_READY
+    chapter.translation_status = StatusChoices.READY if chapter.translation_manifest else StatusChoices.NOT_READY
+    return chapter
+
+
+def reconcile_jobs():
+    """
+    Recover from a crash or restart.
+
+    Requeues jobs whose worker lease expired, or fails them if that was their last
+    attempt, prunes old finished jobs and resets chapters left LOADING or
+    REMOVING without a pending job to what is on disk. Jobs leased by another
+    server process keep their chapters as they are.
+    """
+    now = timezone.now()
+    expired = Job.objects.filter(state=JobStateChoices.RUNNING, lease_expires_at__lt=now)
+    expired.filter(attempts__gte=MAX_ATTEMPTS).update(
+        state=JobStateChoices.FAILED, lease_expires_at=None, error="The worker stopped during its last attempt", updated_at=now
+    )
+    expired.update(state=JobStateChoices.QUEUED, lease_expires_at=None)
+    Job.objects.filter(
+        state__in=[JobStateChoices.DONE, JobStateChoices.FAILED], updated_at__lt=now - KEEP_FINISHED
+    ).delete()
+
+    pending = set(
+        Job.objects.filter(state__in=[JobStateChoices.QUEUED, JobStateChoices.RUNNING])
+        .values_list("manhwa_id", "chapter_index")
+    )
+    in_progress = [StatusChoices.LOADING, StatusChoices.REMOVING]
+    stale = Chapter.objects.filter(Q(download_status__in=in_progress) | Q(translation_status__in=in_progress))
+
+    chapters = []
+    for chapter in stale:
+        if (chapter.manhwa_id, chapter.index) in pending:
+            continue
+        chapters.append(restore_chapter_status(chapter))
+    Chapter.objects.bulk_update(
+        chapters, ["download_status", "translation_status", "download_manifest", "translation_manifest"]
+    )
+
+
+class JobWorker:
+    """Drains the jobs of `tasks` from the Job table on up to `concurrency` daemon threads."""
+    tasks: tuple[str, ...] = ()
+    concurrency: int = 1
+
+    def __init__(self):
+        self._threads = []
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._local = threading.local()
+        self._channel_layer = get_channel_layer()
+
+    def start(self):
+        """Start worker threads until `concurrency` of them are running."""
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            for _ in range(self.concurrency - len(self._threads)):
+                thread = threading.Thread(target=self._run_loop)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+        self._wakeup.set()
+
+    def _run_loop(self):
+        """Worker loop that leases jobs until none are left."""
+        while True:
+            # Cleared before leasing, so a start() signal from here on ends the wait below
+            self._wakeup.clear()
+            for job in fail_exhausted_jobs(self.tasks):
+                print(f"Giving up on job {job}: {job.error}")
+                self.on_failed(job, job.error)
+            with self._lock:
+                job = lease_job(self.tasks)
+                if job is None:
+                    expiry = next_lease_expiry(self.tasks, exclude=self._running)
+                    if expiry is None:
+                        self._threads.remove(threading.current_thread())
+                        return
+                else:
+                    self._running.add(job.pk)
+
+            if job is None:
+                # Another process holds the remaining jobs, wait for their lease to run out
+                self._wakeup.wait(max(1.0, (expiry - timezone.now()).total_seconds()))
+                continue
+
+            try:
+                with LeaseHeartbeat([job]) as self._local.heartbeat:
+                    self.process(job)
+            except Exception as e:
+                print(f"Error processing job {job}: {e}")
+                if not fail_job(job, str(e)):
+                    self.on_failed(job, str(e))
+            finally:
+                with self._lock:
+                    self._running.discard(job.pk)
+
+    def hold(self, jobs: list[Job]):
+        """Keep renewing the leases of more jobs the running job claimed, like the rest of its batch."""
+        self._local.heartbeat.add(jobs)
+
+    def process(self, job: Job):
+        """Run the job and mark it complete. Raising puts it back in the queue."""
+        raise NotImplementedError
+
+    def on_failed(self, job: Job, error: str):
+        """Called once a job has used up all of its attempts."""
+        pass
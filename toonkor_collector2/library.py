@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from toonkor_collector2.api import cached_manhwas
+from toonkor_collector2.event_loop import background_loop
+from toonkor_collector2.models import Chapter, Manhwa
+from toonkor_collector2.toonkor_api import async_toonkor_api
+
+
+def stored_chapter_indexes() -> dict[str, set[int]]:
+    """Map every manhwa_id to the chapter indexes already stored, in one query."""
+    indexes = dict()
+    for manhwa_id, index in Chapter.objects.values_list("manhwa_id", "index"):
+        indexes.setdefault(manhwa_id, set()).add(index)
+    return indexes
+
+
+class LibraryRefresher:
+    """
+    Checks every Manhwa in the library for new chapters.
+
+    Detail pages are fetched concurrently on the background loop and revalidated
+    against the http cache, so unchanged titles cost a 304. Only chapters missing
+    from the Chapter table are inserted, in a single bulk_create.
+    """
+    group_name = "library"
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._channel_layer = get_channel_layer()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """Start a refresh unless one is already running. Returns True if it started."""
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+            return True
+
+    def _run(self):
+        try:
+            background_loop.run(self._refresh())
+        except Exception as e:
+            print(f"Error refreshing library: {e}")
+
+    async def _refresh(self):
+        toonkor_ids = await sync_to_async(list)(Manhwa.objects.values_list("toonkor_id", flat=True))
+        stored = await sync_to_async(stored_chapter_indexes)()
+        progress = {"current": 0, "total": len(toonkor_ids)}
+        summary = {"checked": 0, "new_chapters": {}, "errors": {}}
+        new_chapters = []
+
+        await self._send_progress(progress)
+        tasks = [self._fetch_new_chapters(toonkor_id, stored.get(toonkor_id, set())) for toonkor_id in toonkor_ids]
+        for task in asyncio.as_completed(tasks):
+            toonkor_id, chapters, error = await task
+            progress["current"] += 1
+            if error is not None:
+                summary["errors"][toonkor_id] = error
+            else:
+                summary["checked"] += 1
+                if chapters:
+                    summary["new_chapters"][toonkor_id] = len(chapters)
+                    new_chapters.extend(chapters)
+            await self._send_progress(progress)
+
+        await sync_to_async(Chapter.objects.bulk_create)(new_chapters, batch_size=500, ignore_conflicts=True)
+        for toonkor_id in summary["new_chapters"]:
+            cached_manhwas.pop(toonkor_id)
+
+        await self._send_progress(progress, summary)
+
+    async def _fetch_new_chapters(self, toonkor_id: str, stored_indexes: set[int]):
+        try:
+            details = await async_toonkor_api.get_manga_details(toonkor_id, endpoint="refresh")
+        except Exception as e:
+            return toonkor_id, [], str(e)
+
+        chapters = [
+            Chapter(
+                manhwa_id=toonkor_id,
+                index=chapter["index"],
+                toonkor_id=chapter["toonkor_id"],
+                date_upload=chapter["date_upload"],
+            )
+            for chapter in details["chapters"]
+            if chapter["index"] not in stored_indexes
+        ]
+        return toonkor_id, chapters, None
+
+    async def _send_progress(self, progress, summary=None):
+        """Send progress updates, and the summary once done, to the library group."""
+        event = {"type": "send_progress", "progress": dict(progress)}
+        if summary is not None:
+            event["summary"] = summary
+        await self._channel_layer.group_send(self.group_name, event)
+
+
+library_refresher = LibraryRefresher()
@@ -1,5 +1,9 @@
+import asyncio
+import httpx
 import requests
 import concurrent.futures
+from django.conf import settings
+from toonkor_collector2.cache import TTLCache
 from toonkor_collector2.schemas import ManhwaSchema
 
 
@@ -10,7 +14,7 @@ class MangadexAPI:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         }
         self.base_url = "https://api.mangadex.org"
-        self.cached_manhwas = {}
+        self.cached_manhwas = TTLCache(settings.MANGADEX_CACHE_SIZE, settings.MANGADEX_CACHE_TTL)
 
     def extract_response(self, response):
         output = []
@@ -45,8 +49,9 @@ class MangadexAPI:
         return output
 
     def search(self, query: str) -> list[ManhwaSchema]:
-        if query in self.cached_manhwas:
-            return [self.cached_manhwas[query]]
+        cached = self.cached_manhwas.get(query)
+        if cached is not None:
+            return [cached]
 
         response = self.client.get(
             f"{self.base_url}/manga", params={"title": query}, headers=self.headers
@@ -61,8 +66,9 @@ class MangadexAPI:
      
     def update_toonkor_search(self, toonkor_search: dict) -> ManhwaSchema:
         korean_title = toonkor_search["title"]
-        if korean_title in self.cached_manhwas:
-            toonkor_search.update(self.cached_manhwas[korean_title])
+        cached = self.cached_manhwas.get(korean_title)
+        if cached is not None:
+            toonkor_search.update(cached)
 
         else:
             response = self.client.get(
@@ -89,4 +95,62 @@ class MangadexAPI:
             ]
 
 
+class AsyncMangadexAPI:
+    """
+    httpx based variant of MangadexAPI for the async consumers.
+
+    Results are cached in the wrapped MangadexAPI, so both variants share hits.
+    The client is bound to the loop it is first used on (see background_loop).
+    """
+
+    def __init__(self, api: MangadexAPI, max_concurrent_requests: int = 5):
+        self.api = api
+        self.max_concurrent_requests = max_concurrent_requests
+        self._client = None
+        self._semaphore = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.api.base_url, headers=self.api.headers, timeout=30)
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        client = self.client
+        async with self._semaphore:
+            return await client.get(path, **kwargs)
+
+    async def search(self, query: str) -> list[ManhwaSchema]:
+        cached = self.api.cached_manhwas.get(query)
+        if cached is not None:
+            return [cached]
+
+        response = await self.get("/manga", params={"title": query})
+        return self.api.extract_response(response)
+
+    async def search_by_id(self, id: str) -> list[ManhwaSchema]:
+        response = await self.get(f"/manga/{id}")
+        return self.api.extract_response(response)
+
+    async def update_toonkor_search(self, toonkor_search: dict) -> ManhwaSchema:
+        results = await self.search(toonkor_search["title"])
+        if results:
+            toonkor_search.update(results[0])
+        return toonkor_search
+
+    async def multi_update_toonkor_search(
+        self, toonkor_results: list[ManhwaSchema]
+    ) -> list[ManhwaSchema]:
+        return list(await asyncio.gather(*(
+            self.update_toonkor_search(toonkor_search) for toonkor_search in toonkor_results
+        )))
+
+
 mangadex_api = MangadexAPI()
+async_mangadex_api = AsyncMangadexAPI(mangadex_api)
@@ -0,0 +1,122 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date
+
+
+range_re = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat: os.stat_result, offset: int = 0) -> str:
+    """Strong validator from the size and mtime, which change whenever a page is rewritten."""
+    if offset:
+        return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}-{offset:x}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Return the inclusive (start, end) of a single byte range, or None if unsatisfiable."""
+    match = range_re.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last `end` bytes
+        if not end or int(end) == 0:
+            return None
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+def iter_range(path: str, start: int, length: int, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(
+    request,
+    path: str,
+    content_type: str | None = None,
+    immutable: bool = False,
+    max_age: int = 3600,
+    member: tuple[str, int, int] | None = None,
+):
+    """
+    Serve the file at path with an ETag, conditional requests and byte ranges.
+
+    Whole files go through FileResponse, which the server can send with
+    sendfile. Setting MEDIA_SENDFILE_HEADER hands the transfer to a front
+    proxy instead (X-Sendfile, or X-Accel-Redirect under MEDIA_ACCEL_PREFIX).
+    immutable is for files whose url changes with their content, like the
+    hashed assets of the React build.
+
+    member is the (name, offset, size) of a file stored uncompressed inside the
+    archive at path, which is then served on its own.
+    """
+    stat = os.stat(path)
+    name, offset, size = member if member is not None else (path, 0, stat.st_size)
+    etag = file_etag(stat, offset)
+    if content_type is None:
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable" if immutable else f"public, max-age={max_age}",
+    }
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    # Only single byte ranges are served partially, multiple ranges or other units get the whole file
+    byte_range = request.headers.get("Range")
+    if byte_range and not range_re.match(byte_range.strip()):
+        byte_range = None
+    if_range = request.headers.get("If-Range")
+    if byte_range and (not if_range or if_range.strip() == etag):
+        bounds = parse_range(byte_range, size)
+        if bounds is None:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        start, end = bounds
+        response = StreamingHttpResponse(
+            iter_range(path, offset + start, end - start + 1), status=206, content_type=content_type
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    elif member is not None:
+        response = StreamingHttpResponse(iter_range(path, offset, size), content_type=content_type)
+        response["Content-Length"] = str(size)
+    elif settings.MEDIA_SENDFILE_HEADER:
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_SENDFILE_HEADER == "X-Accel-Redirect":
+            relative_path = os.path.relpath(path, settings.BASE_DIR).replace(os.sep, "/")
+            response["X-Accel-Redirect"] = f"{settings.MEDIA_ACCEL_PREFIX}{relative_path}"
+        else:
+            response[settings.MEDIA_SENDFILE_HEADER] = os.path.abspath(path)
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = str(stat.st_size)
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.1 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+status_rank = {"READY": 3, "LOADING": 2, "REMOVING": 1, "NOT_READY": 0}
+
+
+def dedupe_chapters(apps, schema_editor):
+    """Keep one Chapter per (manhwa_id, index), carrying over the most advanced statuses."""
+    Chapter = apps.get_model("toonkor_collector2", "Chapter")
+    duplicates = (
+        Chapter.objects.values("manhwa_id", "index")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        chapters = list(
+            Chapter.objects.filter(manhwa_id=duplicate["manhwa_id"], index=duplicate["index"]).order_by("id")
+        )
+        keep = chapters[0]
+        for status in ("download_status", "translation_status"):
+            setattr(keep, status, max((getattr(chapter, status) for chapter in chapters), key=lambda x: status_rank.get(x, 0)))
+        keep.save()
+        Chapter.objects.filter(pk__in=[chapter.pk for chapter in chapters[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("toonkor_collector2", "0024_job"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_chapters, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="chapter",
+            constraint=models.UniqueConstraint(
+                fields=("manhwa_id", "index"), name="unique_chapter_index"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("toonkor_collector2", "0025_chapter_unique_chapter_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chapter",
+            name="download_manifest",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="chapter",
+            name="translation_manifest",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
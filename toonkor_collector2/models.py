@@ -1,8 +1,12 @@
 import base64
 import os
 
+from django.conf import settings
 from django.db import models
 from functools import cached_property
+from PIL import Image
+from toonkor_collector2.blob_store import blob_store
+from toonkor_collector2.chapter_archives import archive_manifest, archive_path, unpack_chapter
 
 
 def encode_name(name: str):
@@ -54,8 +58,16 @@ class Chapter(models.Model):
     download_status = models.CharField(max_length=20, choices=StatusChoices.choices, default=StatusChoices.NOT_READY)
     translation_status = models.CharField(max_length=20, choices=StatusChoices.choices, default=StatusChoices.NOT_READY)
 
+    # Pages in reading order as {"name", "width", "height", "size"} and "blob" when deduplicated,
+    # written when a chapter is downloaded or translated
+    download_manifest = models.JSONField(default=list, blank=True)
+    translation_manifest = models.JSONField(default=list, blank=True)
+
     image_extensions = {'.png', '.jpeg', '.jpg', '.webp', '.gif', '.svg'}
 
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["manhwa_id", "index"], name="unique_chapter_index")]
+
     def __str__(self) -> str:
         return f"{self.manhwa_id} - Chapter {self.index}"
     
@@ -90,7 +102,52 @@ class Chapter(models.Model):
             return True
         return False
     
-    def media_pages(self, pages_path: str, media_pages_path: str) -> list[str]:
+    @classmethod
+    def build_manifest(cls, pages_path: str, deduplicate: bool = False) -> list[dict]:
+        """
+        List the pages found in pages_path with their dimensions and byte sizes.
+
+        With deduplicate and MEDIA_DEDUPLICATE, each page is also moved to the blob store.
+        Only downloaded pages are, as the translator rewrites its pages in place.
+        """
+        manifest = []
+        files = os.listdir(pages_path) if os.path.isdir(pages_path) else []
+        if not any(cls.is_page(file) for file in files):
+            # Packing only moves the pages, so the folder of a packed chapter can outlive them
+            return archive_manifest(pages_path, cls.is_page)
+
+        for file in files:
+            if not cls.is_page(file):
+                continue
+            path = os.path.join(pages_path, file)
+            try:
+                # Only the header is read to get the size
+                with Image.open(path) as image:
+                    width, height = image.size
+            except Exception:
+                width, height = None, None
+            page = {"name": file, "width": width, "height": height, "size": os.path.getsize(path)}
+            if deduplicate and settings.MEDIA_DEDUPLICATE:
+                page["blob"] = blob_store.store(path)
+            manifest.append(page)
+        manifest.sort(key=lambda page: int(os.path.splitext(page["name"])[0]))
+        return manifest
+
+    @classmethod
+    def media_page(cls, media_pages_path: str, page: dict) -> str:
+        """Url of a manifest page, its blob when it has one since that url never changes content."""
+        if page.get("blob"):
+            return f'{settings.MEDIA_URL}blobs/{page["blob"][:2]}/{page["blob"]}'
+        return f'{media_pages_path}/{page["name"]}'
+
+    @staticmethod
+    def manifest_blobs(manifest: list[dict]) -> list[str]:
+        return [page["blob"] for page in manifest if page.get("blob")]
+
+    def media_pages(self, pages_path: str, media_pages_path: str, manifest: list[dict] | None = None) -> list[str]:
+        if manifest:
+            return [self.media_page(media_pages_path, page) for page in manifest]
+
         pages = []
         if os.path.isdir(pages_path):
             pages = [f'{media_pages_path}/{file}' for file in os.listdir(pages_path) if self.is_page(file)] 
@@ -99,11 +156,11 @@ class Chapter(models.Model):
 
     @property
     def media_download_pages(self) -> list[str]:
-        return self.media_pages(self.downloaded_path, self.media_downloaded_path)
+        return self.media_pages(self.downloaded_path, self.media_downloaded_path, self.download_manifest)
 
     @property
     def media_translation_pages(self) -> list[str]:
-        return self.media_pages(self.translated_path, self.media_translated_path)
+        return self.media_pages(self.translated_path, self.media_translated_path, self.translation_manifest)
     
     def delete_pages(self, folder_path) -> bool:
         try:
@@ -121,22 +178,63 @@ class Chapter(models.Model):
             return False
 
     def delete_download(self, save=True):
-        if self.delete_pages(self.downloaded_path):
+        # A packed chapter gives its translated pages back before losing its archive
+        archived = os.path.isfile(archive_path(self.downloaded_path))
+        unpack_chapter(self.downloaded_path, downloaded=False)
+        if self.delete_pages(self.downloaded_path) or archived:
+            blob_store.release(self.manifest_blobs(self.download_manifest))
             self.download_status = StatusChoices.NOT_READY
+            self.download_manifest = []
             if save:
                 self.save()
             return True
         return False
 
     def delete_translation(self, save=True):
-        if self.delete_pages(self.translated_path):
+        archived = os.path.isfile(archive_path(self.downloaded_path))
+        unpack_chapter(self.downloaded_path, translated=False)
+        if self.delete_pages(self.translated_path) or archived:
             self.translation_status = StatusChoices.NOT_READY
+            self.translation_manifest = []
             if save:
                 self.save()
             return True
         return False
     
 
+class JobStateChoices(models.TextChoices):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class Job(models.Model):
+    """A chapter-level download, translate or remove task that survives restarts."""
+    task = models.CharField(max_length=20)
+    batch = models.CharField(max_length=32)
+    group_name = models.CharField(max_length=512)
+    manhwa_id = models.CharField(max_length=512)
+    chapter_index = models.IntegerField()
+    chapter = models.JSONField(default=dict)
+    remove_choices = models.JSONField(default=dict, blank=True)
+
+    state = models.CharField(max_length=20, choices=JobStateChoices.choices, default=JobStateChoices.QUEUED)
+    priority = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["state", "task", "-priority", "created_at"], name="job_lease_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.task} {self.manhwa_id} - Chapter {self.chapter_index} ({self.state})"
+
+
 class ToonkorSettings(models.Model):
     name = models.CharField(max_length=512)
     url = models.URLField(default="https://toonkor434.com")
\ No newline at end of file
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from toonkor_collector2.event_loop import background_loop
+
+
+class ProgressAggregator:
+    """
+    Coalesces the chapter progress sent to WebSocket groups.
+
+    Updates are merged per group and flushed at most PROGRESS_FLUSH_RATE times a
+    second on the background loop, carrying only the chapters whose statuses
+    changed since the previous flush. Once a batch is complete it is flushed
+    straight away and the group is forgotten.
+    """
+    fields = ("download_status", "translation_status")
+
+    def __init__(self):
+        self._pending = dict()
+        self._sent = dict()
+        self._last_flush = dict()
+        self._scheduled = set()
+        self._lock = threading.Lock()
+        self._channel_layer = get_channel_layer()
+
+    def push(self, group_name: str, chapters=(), progress: dict | None = None, final: bool = False):
+        """Queue chapter statuses and the batch progress for group_name. Safe to call from any thread."""
+        if progress and progress.get("total") and progress.get("current", 0) >= progress["total"]:
+            final = True
+
+        with self._lock:
+            pending = self._pending.setdefault(group_name, {"chapters": dict(), "progress": None, "final": False})
+            for chapter in chapters:
+                update = {field: str(chapter[field]) for field in self.fields if field in chapter}
+                pending["chapters"].setdefault(int(chapter["index"]), dict()).update(update)
+            if progress is not None:
+                pending["progress"] = progress
+            pending["final"] |= final
+
+            if group_name in self._scheduled and not final:
+                return
+            self._scheduled.add(group_name)
+        background_loop.submit(self._flush_later(group_name, final))
+
+    async def _flush_later(self, group_name: str, immediate: bool):
+        if not immediate:
+            interval = 1 / settings.PROGRESS_FLUSH_RATE
+            delay = self._last_flush.get(group_name, 0) + interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await self.flush(group_name)
+
+    async def flush(self, group_name: str):
+        """Send what is pending for group_name now."""
+        with self._lock:
+            self._scheduled.discard(group_name)
+            pending = self._pending.pop(group_name, None)
+            if pending is None:
+                return
+
+            sent = self._sent.setdefault(group_name, dict())
+            chapters = []
+            for index, update in pending["chapters"].items():
+                previous = sent.setdefault(index, dict())
+                if all(previous.get(field) == value for field, value in update.items()):
+                    continue
+                previous.update(update)
+                # Both known statuses are sent, the client overwrites them together
+                chapters.append({"index": index, **previous})
+
+            if pending["final"]:
+                self._sent.pop(group_name, None)
+                self._last_flush.pop(group_name, None)
+            else:
+                self._last_flush[group_name] = time.monotonic()
+
+        if not chapters and pending["progress"] is None:
+            return
+        event = {"type": "send_progress", "chapters": chapters}
+        if pending["progress"] is not None:
+            event["progress"] = pending["progress"]
+        await self._channel_layer.group_send(group_name, event)
+
+
+progress_aggregator = ProgressAggregator()
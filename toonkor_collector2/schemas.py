@@ -26,6 +26,33 @@ class ManhwaSchema(Schema):
     toonkor_id: str
 
 
+class LibraryManhwaSchema(Schema):
+    """A library entry restricted to the requested fields, with optional chapter counts."""
+    title: str | None = None
+    description: str | None = None
+    chapters: list[ChapterSchema] | None = None
+
+    en_title: str | None = None
+    en_description: str | None = None
+
+    thumbnail: str | None = None
+    in_library: bool | None = None
+
+    mangadex_id: str | None = None
+    toonkor_id: str | None = None
+
+    chapters_count: int | None = None
+    downloaded_count: int | None = None
+    translated_count: int | None = None
+
+
+class PageSchema(Schema):
+    url: str
+    width: int | None = None
+    height: int | None = None
+    size: int | None = None
+
+
 class ChapterPaginationSchema(Schema):
     manhwa_id: str
     manhwa_title: str
@@ -34,6 +61,7 @@ class ChapterPaginationSchema(Schema):
     current_chapter: ChapterSchema
     next_chapter: ChapterSchema | None = None
     pages: list[str] 
+    page_details: list[PageSchema] = []
 
 
 class SetToonkorUrlSchema(Schema):
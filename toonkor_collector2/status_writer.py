@@ -0,0 +1,72 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from toonkor_collector2.models import Chapter
+
+
+class StatusWriter:
+    """
+    Write-behind buffer for chapter status and manifest updates.
+
+    Updates are coalesced per (manhwa_id, index) and written every
+    STATUS_FLUSH_INTERVAL seconds with one bulk_update per set of fields, instead
+    of a save() per page of progress from every worker thread.
+    """
+    chunk_size = 200
+
+    def __init__(self):
+        self._pending = dict()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def update(self, manhwa_id: str, index: int, **statuses):
+        """Queue new values for the status and manifest fields of a chapter."""
+        with self._lock:
+            # Indexes coming from websocket payloads may be strings
+            self._pending.setdefault((manhwa_id, int(index)), {}).update(statuses)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_loop)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def flush(self):
+        """Write every pending update now."""
+        with self._lock:
+            pending, self._pending = self._pending, dict()
+
+        keys = list(pending)
+        for start in range(0, len(keys), self.chunk_size):
+            query = Q()
+            for manhwa_id, index in keys[start:start + self.chunk_size]:
+                query |= Q(manhwa_id=manhwa_id, index=index)
+
+            by_fields = dict()
+            for chapter in Chapter.objects.filter(query):
+                statuses = pending[(chapter.manhwa_id, chapter.index)]
+                for field, value in statuses.items():
+                    setattr(chapter, field, value)
+                by_fields.setdefault(tuple(sorted(statuses)), []).append(chapter)
+
+            with transaction.atomic():
+                for fields, chapters in by_fields.items():
+                    Chapter.objects.bulk_update(chapters, fields)
+
+    def _run_loop(self):
+        """Flush loop that exits once nothing is left to write."""
+        while True:
+            time.sleep(settings.STATUS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing chapter statuses: {e}")
+
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+
+
+status_writer = StatusWriter()
@@ -1,26 +1,73 @@
+import asyncio
 import base64
 import re
 from datetime import datetime
 from typing import List, Optional
 from bs4 import BeautifulSoup
+import httpx
 import requests
 import re
 import os
+import tempfile
 import concurrent.futures
+from requests.adapters import HTTPAdapter
+from django.conf import settings
 from django.utils.timesince import timesince
+from toonkor_collector2.host_slots import HostSlots
+from toonkor_collector2.http_cache import HttpCache
 from toonkor_collector2.models import ToonkorSettings, encode_name
 from toonkor_collector2.schemas import ManhwaSchema
 
 
 class ToonkorAPI:
+    chunk_size = 64 * 1024
+
     def __init__(self):
         self.telegram_url = "https://t.me/s/new_toonkor"
         self.client = requests.Session()
+        # Keep warm connections for the html and thumbnail requests of concurrent API calls
+        adapter = HTTPAdapter(pool_connections=settings.DOWNLOAD_WORKERS, pool_maxsize=settings.DOWNLOAD_WORKERS, max_retries=2)
+        self.client.mount("http://", adapter)
+        self.client.mount("https://", adapter)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         }
-        toonkor_settings, created = ToonkorSettings.objects.get_or_create(name="general")
-        self.base_url = toonkor_settings.url
+        # Read from ToonkorSettings on first use, so importing this module needs no database
+        self._base_url = None
+
+        # Connection budget per host, shared with AsyncToonkorAPI which downloads the chapter pages
+        self.host_slots = HostSlots(settings.DOWNLOAD_CONNECTIONS_PER_HOST)
+
+        # Detail, search and page list html, revalidated once their TTL runs out
+        self.cache = HttpCache(
+            settings.HTTP_CACHE_DIR, settings.HTTP_CACHE_TTL, settings.HTTP_CACHE_MAX_AGE, settings.HTTP_CACHE_MAX_BYTES
+        )
+
+    @property
+    def base_url(self) -> str:
+        if self._base_url is None:
+            toonkor_settings, created = ToonkorSettings.objects.get_or_create(name="general")
+            self._base_url = toonkor_settings.url
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, url: str):
+        self._base_url = url
+
+    def fetch_text(self, url: str, endpoint: str) -> str:
+        """GET url through the http cache, endpoint selecting the TTL."""
+        entry = self.cache.load(url)
+        if self.cache.is_fresh(entry, endpoint):
+            return entry["body"]
+
+        headers = {**self.headers, **self.cache.conditional_headers(entry)}
+        with self.host_slots.hold(url):
+            response = self.client.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            return self.cache.refresh(url, entry)["body"]
+
+        response.raise_for_status()
+        return self.cache.store(url, response.headers, response.text)["body"]
 
     # Settings
     def fetch_toonkor_url(self):
@@ -34,6 +81,8 @@ class ToonkorAPI:
     def set_toonkor_url(self, url: str):
         response = self.client.get(url, headers=self.headers)
         if response.status_code == 200:
+            if toonkor_api.base_url != url:
+                self.cache.clear()
             toonkor_api.base_url = url
             toonkor_settings, created = ToonkorSettings.objects.get_or_create(name="general")
             toonkor_settings.url = url
@@ -99,8 +148,7 @@ class ToonkorAPI:
         }
         search_url = self.search_manga_request(1, query, filters)
 
-        response = self.client.get(search_url, headers=self.headers)
-        soup = BeautifulSoup(response.text, "lxml")
+        soup = BeautifulSoup(self.fetch_text(search_url, "search"), "lxml")
 
         # Parse the search results
         output = []
@@ -116,11 +164,12 @@ class ToonkorAPI:
             "sort": "?fil=%EC%B5%9C%EC%8B%A0",  # Optional: specify sorting (e.g., "Latest")
         }
         search_url = self.search_manga_request(1, mangadex_search["title"], filters)
-        response = self.client.get(search_url, headers=self.headers)
-        if response.status_code != 200:
+        try:
+            text = self.fetch_text(search_url, "search")
+        except requests.RequestException:
             return None
 
-        soup = BeautifulSoup(response.text, "lxml")
+        soup = BeautifulSoup(text, "lxml")
         for element in soup.select(self.search_manga_selector()):
             manga = self.search_manga_from_element(element)
             if not manga:
@@ -175,8 +224,7 @@ class ToonkorAPI:
 
     def get_manga_details(self, toonkor_id: str, chapters_db=dict()) -> ManhwaSchema:
         manga_url = f"{self.base_url}{toonkor_id}"
-        response = self.client.get(manga_url, headers=self.headers)
-        soup = BeautifulSoup(response.text, "lxml")
+        soup = BeautifulSoup(self.fetch_text(manga_url, "details"), "lxml")
         details = self.manga_details_parse(soup, toonkor_id, chapters_db)
         details["toonkor_id"] = toonkor_id
         return details
@@ -217,8 +265,7 @@ class ToonkorAPI:
 
     def get_page_list(self, chapter_id: str):
         chapter_url = f"{self.base_url}{chapter_id}"
-        response = self.client.get(chapter_url, headers=self.headers)
-        soup = BeautifulSoup(response.text, "lxml")
+        soup = BeautifulSoup(self.fetch_text(chapter_url, "pages"), "lxml")
         return self.page_list_parse(soup)
 
     # Filters
@@ -240,51 +287,159 @@ class ToonkorAPI:
         }
 
     # Download
+    @staticmethod
+    def is_downloaded(path: str) -> bool:
+        """Files are only renamed into place once complete, so any non-empty file is done."""
+        return os.path.isfile(path) and os.path.getsize(path) > 0
+
+    def download_file(self, url: str, path: str):
+        """Stream url into a temporary file next to path and rename it into place."""
+        directory = os.path.dirname(path)
+        with self.host_slots.hold(url), self.client.get(url, headers=self.headers, stream=True) as response:
+            response.raise_for_status()
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+            try:
+                written = 0
+                with os.fdopen(fd, "wb") as out_file:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        out_file.write(chunk)
+                        written += len(chunk)
+
+                expected = response.headers.get("Content-Length")
+                if expected is not None and "Content-Encoding" not in response.headers and int(expected) != written:
+                    raise IOError(f"Incomplete download of {url}: {written} of {expected} bytes")
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
     def download_thumbnail(self, manhwa, img_url: str) -> str | None:
         try:
             os.makedirs(manhwa.path, exist_ok=True)
             _, extension = os.path.splitext(img_url)
             img_path = f"{manhwa.path}/thumbnail{extension}"
-            response = requests.get(img_url, stream=True)
-            with open(img_path, "wb") as out_file:
-                out_file.write(response.content)
+            if not self.is_downloaded(img_path):
+                self.download_file(img_url, img_path)
             return os.path.basename(manhwa.path) + f"/thumbnail{extension}"
         except:
             return None
 
-    def download_page(
+
+class AsyncToonkorAPI:
+    """
+    httpx based variant of ToonkorAPI for the async consumers.
+
+    Parsing and the base url are shared with the wrapped ToonkorAPI. The client
+    is bound to the loop it is first used on, so it must always run on the same
+    loop (see background_loop).
+    """
+
+    def __init__(self, api: ToonkorAPI):
+        self.api = api
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=settings.DOWNLOAD_WORKERS, max_keepalive_connections=settings.DOWNLOAD_WORKERS)
+            self._client = httpx.AsyncClient(headers=self.api.headers, limits=limits, timeout=30, follow_redirects=True)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch_text(self, url: str, endpoint: str) -> str:
+        """GET url through the http cache shared with the wrapped ToonkorAPI."""
+        cache = self.api.cache
+        entry = cache.load(url)
+        if cache.is_fresh(entry, endpoint):
+            return entry["body"]
+
+        async with self.api.host_slots.hold_async(url):
+            response = await self.client.get(url, headers=cache.conditional_headers(entry))
+        if response.status_code == 304 and entry is not None:
+            return cache.refresh(url, entry)["body"]
+
+        response.raise_for_status()
+        return cache.store(url, response.headers, response.text)["body"]
+
+    async def search(self, query: str):
+        filters = {
+            "type": "/%EB%8B%A8%ED%96%89%EB%B3%B8",
+            "sort": "?fil=%EC%B5%9C%EC%8B%A0",
+        }
+        text = await self.fetch_text(self.api.search_manga_request(1, query, filters), "search")
+        soup = BeautifulSoup(text, "lxml")
+        return [self.api.search_manga_from_element(element) for element in soup.select(self.api.search_manga_selector())]
+
+    async def update_mangadex_search(self, mangadex_search: ManhwaSchema) -> ManhwaSchema | None:
+        """Complete a MangaDex result with its first Toonkor match, None if there is none."""
+        try:
+            results = await self.search(mangadex_search["title"])
+        except httpx.HTTPError:
+            return None
+        if not results:
+            return None
+        mangadex_search.update(results[0])
+        return mangadex_search
+
+    async def multi_update_mangadex_search(self, mangadex_results: list[ManhwaSchema]) -> list[ManhwaSchema]:
+        results = await asyncio.gather(*(
+            self.update_mangadex_search(mangadex_search) for mangadex_search in mangadex_results
+        ))
+        return [result for result in results if result is not None]
+
+    async def get_manga_details(self, toonkor_id: str, chapters_db: dict | None = None, endpoint: str = "details") -> ManhwaSchema:
+        text = await self.fetch_text(f"{self.api.base_url}{toonkor_id}", endpoint)
+        soup = BeautifulSoup(text, "lxml")
+        details = self.api.manga_details_parse(soup, toonkor_id, chapters_db or {})
+        details["toonkor_id"] = toonkor_id
+        return details
+
+    async def get_page_list(self, chapter_id: str):
+        text = await self.fetch_text(f"{self.api.base_url}{chapter_id}", "pages")
+        soup = BeautifulSoup(text, "lxml")
+        return self.api.page_list_parse(soup)
+
+    async def download_file(self, url: str, path: str):
+        """Stream url into a temporary file next to path and rename it into place."""
+        async with self.api.host_slots.hold_async(url), self.client.stream("GET", url) as response:
+            response.raise_for_status()
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as out_file:
+                    async for chunk in response.aiter_bytes(self.api.chunk_size):
+                        out_file.write(chunk)
+
+                expected = response.headers.get("Content-Length")
+                if expected is not None and int(expected) != response.num_bytes_downloaded:
+                    raise IOError(f"Incomplete download of {url}: {response.num_bytes_downloaded} of {expected} bytes")
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+    async def download_page(
         self, manhwa_path: str, chapter_index: str, page_index: str, page_url: str
     ) -> str:
-        with requests.get(page_url, stream=True) as response:
-            _, extension = os.path.splitext(page_url)
-            img_path = os.path.abspath(f"{manhwa_path}/{chapter_index}/{page_index}{extension}")
-            if not os.path.exists(img_path):
-                with open(img_path, "wb") as out_file:
-                    out_file.write(response.content)
-            return img_path
-
-    def download_chapter(self, manhwa_id: str, chapter_dict: dict) -> list[str]:
+        _, extension = os.path.splitext(page_url)
+        img_path = os.path.abspath(f"{manhwa_path}/{chapter_index}/{page_index}{extension}")
+        if not self.api.is_downloaded(img_path):
+            await self.download_file(page_url, img_path)
+        return img_path
+
+    async def download_chapter(self, manhwa_id: str, chapter_dict: dict) -> list[str]:
         try:
-            # Create necessary directories
             manhwa_path = f"toonkor_collector2/media/{encode_name(manhwa_id)}"
             os.makedirs(f"{manhwa_path}/{chapter_dict['index']}", exist_ok=True)
 
-            # Get chapter details
-            page_list = self.get_page_list(chapter_dict['toonkor_id'])
-
-            # Download all pages concurrently
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                futures = [
-                    executor.submit(
-                        self.download_page, manhwa_path, chapter_dict["index"], page["index"], page["url"]
-                    )
-                    for page in page_list
-                ]
-                page_paths = {
-                    future.result()
-                    for future in concurrent.futures.as_completed(futures)
-                }
-
+            page_list = await self.get_page_list(chapter_dict['toonkor_id'])
+            page_paths = await asyncio.gather(*(
+                self.download_page(manhwa_path, chapter_dict["index"], page["index"], page["url"])
+                for page in page_list
+            ))
             return list(page_paths)
 
         except Exception as e:
@@ -293,3 +448,4 @@ class ToonkorAPI:
 
 
 toonkor_api = ToonkorAPI()
+async_toonkor_api = AsyncToonkorAPI(toonkor_api)
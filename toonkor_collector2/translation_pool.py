@@ -0,0 +1,92 @@
+import concurrent.futures
+import multiprocessing
+import threading
+
+from django.conf import settings
+
+
+class TranslationPool:
+    """
+    Pool of headless Comic Translate worker processes.
+
+    Chapters are pushed onto a shared job queue and picked up by whichever worker
+    is free, so translation throughput scales with COMIC_TRANSLATE_WORKERS instead
+    of being tied to the single GUI process. The translate jobs that feed it are
+    leased by translator.Translator.
+    """
+
+    def __init__(self):
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs = None
+        self._results = None
+        self._workers = []
+        self._thread = None
+        self._lock = threading.Lock()
+        # Future of each chapter being translated, keyed by (manhwa_id, chapter_index)
+        self._pending = dict()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.COMIC_TRANSLATE_WORKERS > 0
+
+    def start(self):
+        """Spawn the worker processes and the result thread if they are not running."""
+        from comic_headless import run_headless_worker
+
+        with self._lock:
+            if self._jobs is None:
+                self._jobs = self._context.Queue()
+                self._results = self._context.Queue()
+
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            for _ in range(settings.COMIC_TRANSLATE_WORKERS - len(self._workers)):
+                worker = self._context.Process(
+                    target=run_headless_worker,
+                    args=(
+                        str(settings.COMIC_TRANSLATE_SETTINGS), self._jobs, self._results,
+                        settings.COMIC_TRANSLATE_WARM_MODELS, settings.COMIC_TRANSLATE_MODEL_BUDGET_MB,
+                    )
+                )
+                worker.daemon = True
+                worker.start()
+                self._workers.append(worker)
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_loop)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def translate(self, manhwa_id, chapter_index, page_paths) -> concurrent.futures.Future:
+        """Queue a downloaded chapter for translation. The future resolves to None, or the error of the worker."""
+        self.start()
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._pending[(manhwa_id, int(chapter_index))] = future
+        self._jobs.put((manhwa_id, chapter_index, list(page_paths)))
+        return future
+
+    def is_alive(self) -> bool:
+        with self._lock:
+            return any(worker.is_alive() for worker in self._workers)
+
+    def stop(self):
+        """Ask every worker to exit once the jobs already queued are done."""
+        with self._lock:
+            for _ in self._workers:
+                self._jobs.put(None)
+            self._workers = []
+
+    def _run_loop(self):
+        """Result loop that resolves the future of each finished chapter."""
+        while True:
+            try:
+                manhwa_id, chapter_index, error = self._results.get()
+                with self._lock:
+                    future = self._pending.pop((manhwa_id, int(chapter_index)), None)
+                if future is not None:
+                    future.set_result(error)
+            except Exception as e:
+                print(f"Error processing translation result: {e}")
+
+
+translation_pool = TranslationPool()
@@ -0,0 +1,103 @@
+import asyncio
+import concurrent.futures
+
+from django.conf import settings
+from toonkor_collector2.api import comic_proc_alive, start_comic_proc, update_cached_chapter
+from toonkor_collector2.jobs import JobWorker, batch_progress, complete_job
+from toonkor_collector2.models import Chapter, Job, StatusChoices
+from toonkor_collector2.progress import progress_aggregator
+from toonkor_collector2.status_writer import status_writer
+from toonkor_collector2.translation_pool import translation_pool
+
+
+class Translator(JobWorker):
+    """
+    Drains the translate jobs queued as download_translate chapters finish downloading.
+
+    Chapters go to the headless translation pool when COMIC_TRANSLATE_WORKERS is
+    set, otherwise to the Comic Translate GUI one at a time. A job is held until
+    its chapter is translated, so the translation backlog survives restarts.
+    """
+    tasks = ('translate',)
+    # Seconds between checks that the process translating a chapter is still alive
+    poll_interval = 30
+
+    def __init__(self):
+        super().__init__()
+        self._gui_requests = dict()
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, settings.COMIC_TRANSLATE_WORKERS)
+
+    def process(self, job: Job):
+        manhwa_id, chapter_index = job.manhwa_id, job.chapter_index
+        if translation_pool.enabled:
+            future = translation_pool.translate(manhwa_id, chapter_index, job.chapter['page_paths'])
+            error = self._wait(future, translation_pool.is_alive)
+        else:
+            error = self._translate_in_gui(job)
+        if error is not None:
+            raise Exception(f"Failed to translate chapter {chapter_index + 1} of {manhwa_id}: {error}")
+
+        manifest = Chapter.build_manifest(Chapter(manhwa_id=manhwa_id, index=chapter_index).translated_path)
+        if not manifest:
+            raise Exception(f"No translated pages for chapter {chapter_index + 1} of {manhwa_id}")
+        status_writer.update(manhwa_id, chapter_index, translation_status=StatusChoices.READY, translation_manifest=manifest)
+        update_cached_chapter(manhwa_id, chapter_index, 'translation_status', 'READY')
+
+        if not complete_job(job):
+            # The lease ran out and another worker took the chapter over, it reports the progress
+            return
+        progress_aggregator.push(
+            job.group_name,
+            [{"index": chapter_index, "download_status": "READY", "translation_status": "READY"}],
+            batch_progress(job.batch, job.task),
+        )
+
+    def on_failed(self, job: Job, error: str):
+        status_writer.update(job.manhwa_id, job.chapter_index, translation_status=StatusChoices.NOT_READY)
+        update_cached_chapter(job.manhwa_id, job.chapter_index, 'translation_status', 'NOT_READY')
+        progress_aggregator.push(
+            job.group_name,
+            [{"index": job.chapter_index, "translation_status": "NOT_READY"}],
+            batch_progress(job.batch, job.task),
+        )
+        asyncio.run(self._channel_layer.group_send(job.group_name, {"type": "send_progress", "error": error}))
+
+    def gui_finished(self, manhwa_id: str, chapter_index: int) -> bool:
+        """Called when the GUI reports a chapter translated. Returns whether a job was waiting for it."""
+        with self._lock:
+            future = self._gui_requests.pop((manhwa_id, int(chapter_index)), None)
+        if future is None:
+            return False
+        future.set_result(None)
+        return True
+
+    def _translate_in_gui(self, job: Job) -> str | None:
+        key = (job.manhwa_id, job.chapter_index)
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._gui_requests[key] = future
+        try:
+            start_comic_proc()
+            to_translate = {job.manhwa_id: {job.chapter_index: {"page_paths": job.chapter['page_paths']}}}
+            asyncio.run(self._channel_layer.group_send(
+                "qt", {"type": "send_translation_request", "to_translate": to_translate}
+            ))
+            return self._wait(future, comic_proc_alive)
+        finally:
+            with self._lock:
+                self._gui_requests.pop(key, None)
+
+    def _wait(self, future: concurrent.futures.Future, is_alive) -> str | None:
+        """The result of future, raising if the process translating it exits first."""
+        while True:
+            try:
+                return future.result(timeout=self.poll_interval)
+            except concurrent.futures.TimeoutError:
+                if not is_alive():
+                    raise Exception("The translation process exited before finishing the chapter")
+
+
+translator = Translator()
@@ -1,13 +1,58 @@
 import posixpath
 from pathlib import Path
 
+from django.conf import settings
+from django.http import Http404
 from django.utils._os import safe_join
-from django.views.static import serve as static_serve
+from toonkor_collector2.chapter_archives import locate_page
+from toonkor_collector2.derivatives import derivatives
+from toonkor_collector2.media import serve_file
 
 def serve_react(request, path, document_root=None):
     path = posixpath.normpath(path).lstrip("/")
     fullpath = Path(safe_join(document_root, path))
     if fullpath.is_file():
-        return static_serve(request, path, document_root)
+        # Vite puts a content hash in the name of everything under assets/
+        return serve_file(request, str(fullpath), immutable=path.startswith("assets/"))
     else:
-        return static_serve(request, "index.html", document_root)
\ No newline at end of file
+        return serve_file(request, str(Path(document_root) / "index.html"), max_age=0)
+
+
+def serve_packed_page(request, fullpath: Path):
+    """Serve a page that only exists inside its chapter archive."""
+    located = locate_page(str(fullpath))
+    if located is None:
+        raise Http404(f"{fullpath.name} does not exist")
+    archive, offset, size = located
+    return serve_file(request, archive, member=(fullpath.name, offset, size))
+
+
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip("/")
+    fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    if not fullpath.is_file():
+        return serve_packed_page(request, fullpath)
+    # Blobs are named after their content
+    return serve_file(request, str(fullpath), immutable=path.startswith("blobs/"))
+
+
+def serve_derivative(request, width, path):
+    """Serve a media image resized to width, as WebP or AVIF when the client accepts it."""
+    path = posixpath.normpath(path).lstrip("/")
+    fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    if not fullpath.is_file():
+        # Packed pages are served as they are
+        return serve_packed_page(request, fullpath)
+
+    format = derivatives.choose_format(request.headers.get("Accept", ""))
+    if format is None:
+        return serve_file(request, str(fullpath))
+    try:
+        derived_path = derivatives.get(str(fullpath), int(width), format)
+    except (OSError, ValueError):
+        # Not an image Pillow can resize, or too large for the format
+        return serve_file(request, str(fullpath))
+
+    response = serve_file(request, derived_path, content_type=derivatives.content_types[format])
+    response["Vary"] = "Accept"
+    return response
\ No newline at end of file
@@ -58,12 +58,16 @@ const ChaptersTable = ({ toonkorId, chapterDataList = [] }: ChaptersTableProps)
   }, [filters]);
 
   const handleWebSocketMessage = (e: MessageEvent) => {
-    const { chapters: updatedChapters } = JSON.parse(e.data);
-    console.log(updatedChapters);
+    const { chapters: updatedChapters = [] } = JSON.parse(e.data);
+    // Progress messages only carry the statuses that changed
     for (const chapter of updatedChapters) {
       const chapterIndex = chapter.index;
-      chapterDataList[chapterIndex].download_status = chapter.download_status;
-      chapterDataList[chapterIndex].translation_status = chapter.translation_status;
+      if (chapter.download_status !== undefined) {
+        chapterDataList[chapterIndex].download_status = chapter.download_status;
+      }
+      if (chapter.translation_status !== undefined) {
+        chapterDataList[chapterIndex].translation_status = chapter.translation_status;
+      }
     }
 
     const updatedChapterList = [...chapterDataList];
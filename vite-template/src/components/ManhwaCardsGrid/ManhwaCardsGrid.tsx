@@ -4,6 +4,7 @@ import ManhwaData from '@/types/manhwaData';
 import { useNavigate } from 'react-router-dom';
 import { SettingsContext } from '@/contexts/SettingsContext';
 import { useContext } from 'react';
+import { derivedUrl } from '@/utils/derivedImage';
 
 
 interface ManhwaCardsGridProps {
@@ -27,7 +28,7 @@ export function ManhwaCardsGrid({ data }: ManhwaCardsGridProps) {
     onClick={(event) => {event.preventDefault(); navigate(`/manhwa${manhwaData.toonkor_id}`)}}
     className={classes.card}>
       <AspectRatio ratio={1920 / 1080}>
-        <Image src={manhwaData.thumbnail} />
+        <Image src={derivedUrl(manhwaData.thumbnail, 480)} />
       </AspectRatio>
       <Text className={classes.title} mx={5} ta="center">
         {displayEnglish && manhwaData.en_title ? manhwaData.en_title : manhwaData.title}
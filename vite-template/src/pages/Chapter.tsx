@@ -6,7 +6,8 @@ import classes from '@/pages/Chapter.module.css'
 import { NavBar } from '@/components/NavBar/NavBar';
 import MenuLink from '@/components/MenuLinks/MenuLinks';
 import ChapterData from '@/types/chapterData';
-import PaginationData from '@/types/paginationData';
+import PaginationData, { PageData } from '@/types/paginationData';
+import { derivedSrcSet } from '@/utils/derivedImage';
 import { useContext } from 'react';
 import { SettingsContext } from '@/contexts/SettingsContext';
 import { Link } from 'react-router-dom';
@@ -48,8 +49,12 @@ const paginationButtonGroup = (paginationData: PaginationData) => {
   )
 }
 
-const pages = (pages: string[]) => {
-  return pages.map((pagePath: string) => (<img src={pagePath} key={pagePath} className={classes.images}/>))
+const pages = (pages: PageData[]) => {
+  // width and height let the browser reserve each page's space before it loads
+  return pages.map((page: PageData) => (
+    <img src={page.url} srcSet={derivedSrcSet(page.url, page.width)} sizes="100vw" key={page.url}
+      width={page.width ?? undefined} height={page.height ?? undefined} className={classes.images}/>
+  ))
 }
 
 const Chapter = () => {
@@ -66,7 +71,7 @@ const Chapter = () => {
         <Stack mx="auto" gap={0}>
           {!loading && data && paginationButtonGroup(data)}
             {!loading && error && <Text c="red">{error.message}</Text>}
-            {!loading && data && pages(data.pages)}
+            {!loading && data && pages(data.page_details)}
             {scroll.y !== 0 && <ActionIcon size="lg" radius="lg" className={classes.anchor} onClick={() => scrollTo({ y: 0 })}>
                 <IconChevronUp />
             </ActionIcon>}
@@ -1,5 +1,12 @@
 import ChapterData from "./chapterData";
 
+export interface PageData {
+    url: string;
+    width: number | null;
+    height: number | null;
+    size: number | null;
+}
+
 interface PaginationData {
     manhwa_id: string
     manhwa_title: string;
@@ -10,6 +17,7 @@ interface PaginationData {
     next_chapter: ChapterData;
 
     pages: string[]
+    page_details: PageData[];
 }
 
 export default PaginationData;
\ No newline at end of file
@@ -0,0 +1,17 @@
+const derivedWidths = [160, 320, 480, 720, 1080];
+
+// Resized WebP/AVIF copy of a /media/ image, served by Django under /derived/<width>/
+export const derivedUrl = (url: string, width: number) => {
+  return url.startsWith('/media/') ? `/derived/${width}/${url.slice('/media/'.length)}` : url;
+};
+
+export const derivedSrcSet = (url: string, maxWidth?: number | null) => {
+  if (!url.startsWith('/media/')) {
+    return undefined;
+  }
+  return derivedWidths
+    .filter((width) => !maxWidth || width < maxWidth)
+    .map((width) => `${derivedUrl(url, width)} ${width}w`)
+    .concat(maxWidth ? [`${url} ${maxWidth}w`] : [])
+    .join(', ');
+};